@@ -0,0 +1,91 @@
+import threading
+import time
+
+import arcade
+
+# Текстуры грузятся один раз и общие для всех спрайтов
+_textures = {}
+_lock = threading.Lock()
+
+
+def get_texture(filename):
+    # Файл, до которого фоновая загрузка ещё не дошла, грузится сразу - медленнее, но без ошибки
+    texture = _textures.get(filename)
+    if texture is None:
+        texture = arcade.load_texture(filename)
+        with _lock:
+            texture = _textures.setdefault(filename, texture)
+    return texture
+
+
+class Loader:
+    # Запуск игры за экраном загрузки. PNG декодируются в фоновом потоке, а всё, что трогает
+    # OpenGL (атлас текстур, шрифты, запекание карты), идёт в главном потоке по шагам -
+    # не дольше budget секунд за кадр, чтобы экран загрузки успевал перерисовываться.
+    # steps - (название, функция), выполняются после текстур; times - сколько занял каждый шаг.
+
+    def __init__(self, files, steps=()):
+        self.files = list(files)
+        self.steps = list(steps)
+        self.decoded = 0
+        self.uploaded = 0
+        self.step = 0
+        self.error = None
+        self.times = {}
+        self.thread = threading.Thread(target=self._worker, name="assets", daemon=True)
+        self.thread.start()
+
+    def _worker(self):
+        start = time.perf_counter()
+        for filename in self.files:
+            try:
+                get_texture(filename)
+            except (OSError, ValueError) as e:
+                self.error = e
+                return
+            self.decoded += 1
+        self.times["decode"] = time.perf_counter() - start
+
+    @property
+    def total(self):
+        return len(self.files) + len(self.steps)
+
+    @property
+    def progress(self):
+        return (self.uploaded + self.step) / self.total if self.total else 1.0
+
+    @property
+    def done(self):
+        return self.step == len(self.steps) and self.uploaded == len(self.files)
+
+    @property
+    def status(self):
+        if self.uploaded < len(self.files):
+            return "Текстуры"
+        return self.steps[self.step][0] if self.step < len(self.steps) else "Готово"
+
+    def update(self, budget=0.008):
+        # Шаг загрузки в кадре; True, когда всё готово
+        if self.error: raise self.error
+        deadline = time.perf_counter() + budget
+        atlas = arcade.get_window().ctx.default_atlas
+        # В атлас заранее: иначе первая волна загружала бы текстуры в видеокарту на лету
+        while self.uploaded < self.decoded:
+            atlas.add(_textures[self.files[self.uploaded]])
+            self.uploaded += 1
+            if time.perf_counter() > deadline: return False
+        if self.uploaded < len(self.files):
+            return False
+        while self.step < len(self.steps):
+            name, func = self.steps[self.step]
+            start = time.perf_counter()
+            func()
+            self.times[name] = time.perf_counter() - start
+            self.step += 1
+            if time.perf_counter() > deadline: break
+        return self.done
+
+    def finish(self):
+        # Дозагрузить всё сразу (замеры, запуск без окна загрузки)
+        self.thread.join()
+        self.update(budget=float("inf"))
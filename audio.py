@@ -0,0 +1,171 @@
+import math
+
+# Звуки игры. Каждый грузится один раз и играет через постоянный набор голосов:
+# голос - один плеер на всю игру, новый звук ставится в него вместо старого.
+# play() за кадр только копит заявки, update() раз в кадр сводит одинаковые в один голос -
+# 50 метеоритов от одного взрыва ракеты дают один звук погромче, а не 50 плееров.
+# Одному звуку достаётся не больше limit голосов: сверх того он перебивает свой же самый старый.
+# Когда свободных голосов нет, вытесняется менее важный звук, из равных - самый старый.
+
+SOUNDS = {
+    # имя: (файл, громкость, приоритет, limit)
+    "death": (":resources:sounds/explosion2.wav", 0.35, 1, 4),
+    "build": (":resources:sounds/coin1.wav", 0.5, 2, 2),
+    "leak": (":resources:sounds/hurt3.wav", 0.7, 3, 2),
+}
+
+VOICES = 8
+MIN_GAP = 0.06  # тот же звук чаще не запускается - заявки сливаются с уже играющим
+NULL_LENGTH = 0.5  # длительность звука без звуковой карты
+
+
+class NullBackend:
+    # Без звуковой карты: голоса только учитываются (проверки, --mute)
+
+    def __init__(self):
+        self.started = 0
+
+    def voice(self):
+        return None
+
+    def load(self, filename):
+        return filename, NULL_LENGTH
+
+    def start(self, voice, source, volume, pan):
+        self.started += 1
+
+    def stop(self, voice):
+        pass
+
+
+class PygletBackend:
+    # Голос - pyglet Player из arcade; звуки декодируются в память целиком (без потоковой загрузки)
+
+    def __init__(self):
+        import arcade
+        import pyglet
+        self.arcade = arcade
+        self.media = pyglet.media
+
+    def voice(self):
+        return self.media.Player()
+
+    def load(self, filename):
+        sound = self.arcade.load_sound(filename)
+        return sound.source, sound.get_length()
+
+    def start(self, player, source, volume, pan):
+        player.pause()
+        playing = player.source is not None
+        player.queue(source)
+        if playing:
+            player.next_source()  # прервать прошлый звук этого голоса
+        player.volume = volume
+        # Панорама как в arcade.Sound.play
+        player.position = (pan, 0.0, math.sqrt(1 - pan * pan))
+        player.play()
+
+    def stop(self, player):
+        player.pause()
+
+
+class Voice:
+    def __init__(self, handle):
+        self.handle = handle
+        self.name = None
+        self.priority = 0
+        self.started = -1.0
+        self.ends = -1.0
+
+
+class Audio:
+    def __init__(self, backend=None, voices=VOICES, min_gap=MIN_GAP):
+        self.backend = backend or NullBackend()
+        self.voices = [Voice(self.backend.voice()) for _ in range(voices)]
+        self.min_gap = min_gap
+        self.sounds = {}
+        self.requests = {}  # имя -> [заявок за кадр, сумма панорам]
+        self.last = {}  # имя -> когда звук последний раз запускался
+        self.clock = 0.0
+        self.stats = {"requests": 0, "started": 0, "merged": 0, "stolen": 0, "dropped": 0}
+
+    def load_all(self):
+        for name, (filename, _, _, _) in SOUNDS.items():
+            self.sounds[name] = self.backend.load(filename)
+
+    def play(self, name, pan=0.0):
+        request = self.requests.get(name)
+        if request is None:
+            self.requests[name] = [1, pan]
+        else:
+            request[0] += 1
+            request[1] += pan
+        self.stats["requests"] += 1
+
+    def update(self, dt):
+        self.clock += dt
+        if not self.requests: return
+        for name, (count, pan_sum) in self.requests.items():
+            if self.clock - self.last.get(name, -math.inf) < self.min_gap:
+                self.stats["merged"] += count
+            else:
+                self._start(name, count, pan_sum / count)
+        self.requests.clear()
+
+    def _start(self, name, count, pan):
+        if name not in self.sounds:
+            self.sounds[name] = self.backend.load(SOUNDS[name][0])
+        source, length = self.sounds[name]
+        _, volume, priority, limit = SOUNDS[name]
+        voice = self._voice(name, priority, limit)
+        if voice is None:
+            self.stats["dropped"] += count
+            return
+        # Много одновременных - громче, но не в count раз
+        volume = min(1.0, volume * (1 + 0.25 * math.log2(count)))
+        self.backend.start(voice.handle, source, volume, max(-1.0, min(1.0, pan)))
+        voice.name, voice.priority = name, priority
+        voice.started, voice.ends = self.clock, self.clock + length
+        self.last[name] = self.clock
+        self.stats["started"] += 1
+        self.stats["merged"] += count - 1
+
+    def _voice(self, name, priority, limit):
+        own = [v for v in self.voices if v.name == name and v.ends > self.clock]
+        if len(own) >= limit:
+            victim = min(own, key=lambda v: v.started)
+        else:
+            for voice in self.voices:
+                if voice.ends <= self.clock:
+                    return voice
+            victim = min(self.voices, key=lambda v: (v.priority, v.started))
+            if victim.priority > priority:
+                return None  # все голоса заняты более важными звуками
+        self.backend.stop(victim.handle)
+        self.stats["stolen"] += 1
+        return victim
+
+    @property
+    def busy(self):
+        return sum(1 for v in self.voices if v.ends > self.clock)
+
+
+if __name__ == "__main__":
+    import time
+
+    # Нагрузка без звуковой карты: взрывы по 50 убийств за кадр вперемешку с утечками и стройкой
+    audio = Audio(NullBackend())
+    audio.load_all()
+    frames, worst = 3600, 0.0
+    start = time.perf_counter()
+    for i in range(frames):
+        for k in range(50):
+            audio.play("death", (k % 21 - 10) / 10)
+        if i % 7 == 0: audio.play("leak")
+        if i % 13 == 0: audio.play("build", 0.5)
+        t = time.perf_counter()
+        audio.update(1 / 60)
+        worst = max(worst, time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    print(f"{frames} кадров: {audio.stats}, голосов занято {audio.busy}/{len(audio.voices)}")
+    print(f"{elapsed / frames * 1e6:.1f} мкс на кадр с заявками, update до {worst * 1e6:.1f} мкс")
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from paths import DEFAULT_MAP, load_map
+from simulation import DIFFICULTIES, TICK, TOWER_TYPES, Simulation
+
+DECIDE_EVERY = 30  # бот решает, что строить, раз в полсекунды игрового времени
+
+
+# Оценка баланса: тысячи матчей без окна на всех ядрах.
+# Матч играет бот-стратегия, результат - доля побед, потерянные жизни и волна поражения
+# для каждого набора параметров. Наборы - имя -> {"difficulty": ..., "params": {...}},
+# params переопределяют DIFFICULTIES (см. simulation.py).
+#
+#   python balance.py --matches 2000
+#   python balance.py --sets my_sets.json --strategy greedy random --out report.json
+
+
+# ---- Стратегии: вызываются раз в DECIDE_EVERY тиков, строят через sim.command, как игрок ----
+
+def line_strategy(sim, rng, cells):
+    # Как прогон в simulation.py: лазеры в ряд на высоте 200
+    for x in range(100, 800, 80):
+        if sim.can_place("BASIC", x, 200):
+            sim.command("place", "BASIC", x, 200)
+
+
+def random_strategy(sim, rng, cells):
+    # Случайная башня в случайную свободную клетку, пока хватает денег
+    for _ in range(20):
+        kind = rng.choice(("BASIC", "SNIPER"))
+        if sim.money < sim.tower_cost(kind): return
+        x, y = rng.choice(cells["all"])
+        if sim.can_place(kind, x, y):
+            sim.command("place", kind, x, y)
+
+
+def greedy_strategy(sim, rng, cells):
+    # Клетки с наибольшим покрытием пути; каждая третья башня - ракетница
+    while True:
+        kind = "SNIPER" if len(sim.towers) % 3 == 2 else "BASIC"
+        if sim.money < sim.tower_cost(kind): return
+        for x, y in cells[kind]:
+            if sim.can_place(kind, x, y):
+                sim.command("place", kind, x, y)
+                break
+        else:
+            return
+
+
+STRATEGIES = {"line": line_strategy, "random": random_strategy, "greedy": greedy_strategy}
+
+DEFAULT_SETS = {name: {"difficulty": name, "params": {}} for name in DIFFICULTIES}
+
+
+# ---- Один матч (выполняется в процессе пула) ----
+
+_maps = {}
+_rankings = {}
+
+
+def _load(map_file):
+    # Карта и свободные клетки считаются один раз на процесс
+    if map_file not in _maps:
+        path = load_map(map_file)
+        build = Simulation(path=path, seed=0).build
+        cs = build.cell_size
+        free = [(col * cs + cs // 2, row * cs + cs // 2) for row in range(build.rows) for col in range(build.cols)]
+        _maps[map_file] = path, [c for c in free if build.is_free(*c)]
+    return _maps[map_file]
+
+
+def _cells(map_file, sim):
+    # Рейтинг клеток по покрытию пути - с радиусами башен из params набора, как их построит place_tower.
+    # Считается один раз на процесс для каждой карты и сочетания радиусов.
+    path, free = _load(map_file)
+    ranges = tuple(sim.tower_range(kind) for kind in TOWER_TYPES)
+    key = (map_file, ranges)
+    if key not in _rankings:
+        cells = {"all": free}
+        for kind, radius in zip(TOWER_TYPES, ranges):
+            cover = {c: sum(d1 - d0 for d0, d1 in path.ranges_within(c[0], c[1], radius)) for c in free}
+            cells[kind] = sorted(free, key=lambda c: -cover[c])
+        _rankings[key] = cells
+    return _rankings[key]
+
+
+def play_match(job):
+    set_name, config, strategy, seed, map_file, max_ticks = job
+    path, _ = _load(map_file)
+    sim = Simulation(config["difficulty"], path, seed=seed, params=config.get("params"))
+    cells = _cells(map_file, sim)
+    bot = STRATEGIES[strategy]
+    rng = random.Random(seed ^ 0x5EED)
+    while sim.state == "GAME" and sim.ticks < max_ticks:
+        if sim.ticks % DECIDE_EVERY == 0:
+            bot(sim, rng, cells)
+        sim.step(TICK)
+        sim.added.clear()
+        sim.removed.clear()
+    return {
+        "set": set_name, "strategy": strategy, "seed": seed, "state": sim.state,
+        "wave": min(sim.wave_num, sim.params["waves"]), "lives_lost": sim.params["lives"] - max(sim.lives, 0),
+        "score": sim.score, "ticks": sim.ticks, "towers": len(sim.towers),
+    }
+
+
+# ---- Сводка ----
+
+def summarize(results):
+    groups = {}
+    for r in results:
+        groups.setdefault((r["set"], r["strategy"]), []).append(r)
+    report = []
+    for (set_name, strategy), rows in groups.items():
+        n = len(rows)
+        wins = sum(r["state"] == "WIN" for r in rows)
+        deaths = {}
+        for r in rows:
+            if r["state"] == "GAMEOVER":
+                deaths[r["wave"]] = deaths.get(r["wave"], 0) + 1
+        lost = {}
+        for r in rows:
+            lost[r["lives_lost"]] = lost.get(r["lives_lost"], 0) + 1
+        report.append({
+            "set": set_name, "strategy": strategy, "matches": n,
+            "win_rate": wins / n,
+            "timeouts": sum(r["state"] == "GAME" for r in rows),
+            "lives_lost_mean": sum(r["lives_lost"] for r in rows) / n,
+            "lives_lost": dict(sorted(lost.items())),
+            "death_wave": dict(sorted(deaths.items())),
+            "score_mean": sum(r["score"] for r in rows) / n,
+            "towers_mean": sum(r["towers"] for r in rows) / n,
+        })
+    return report
+
+
+def evaluate(sets, strategies, matches, workers=None, map_file=DEFAULT_MAP, seed=0, max_ticks=200_000):
+    # Один и тот же список seed для каждого набора и стратегии - сравнение на одинаковых матчах
+    jobs = [(name, config, strategy, seed + i, map_file, max_ticks)
+            for name, config in sets.items() for strategy in strategies for i in range(matches)]
+    if workers == 1:
+        results = [play_match(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            chunk = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 8))
+            results = list(pool.map(play_match, jobs, chunksize=chunk))
+    return summarize(results)
+
+
+def print_report(report):
+    print(f"{'набор':<14}{'стратегия':<10}{'матчей':>7}{'победы':>8}{'жизни-':>8}  волна поражения")
+    for r in report:
+        deaths = " ".join(f"{w}:{c}" for w, c in r["death_wave"].items()) or "-"
+        print(f"{r['set']:<14}{r['strategy']:<10}{r['matches']:>7}{r['win_rate']:>8.1%}"
+              f"{r['lives_lost_mean']:>8.2f}  {deaths}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Оценка баланса по тысячам матчей без окна")
+    parser.add_argument("--matches", type=int, default=500, help="матчей на набор и стратегию")
+    parser.add_argument("--strategy", nargs="*", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--sets", help="JSON: {имя: {\"difficulty\": ..., \"params\": {...}}}")
+    parser.add_argument("--map", default=DEFAULT_MAP)
+    parser.add_argument("--workers", type=int, default=None, help="процессов, по умолчанию все ядра")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="сохранить сводку в JSON")
+    args = parser.parse_args()
+
+    sets = DEFAULT_SETS
+    if args.sets:
+        with open(args.sets, encoding="utf-8") as f:
+            sets = json.load(f)
+
+    start = time.perf_counter()
+    report = evaluate(sets, args.strategy, args.matches, args.workers, args.map, args.seed)
+    elapsed = time.perf_counter() - start
+    print_report(report)
+    total = sum(r["matches"] for r in report)
+    print(f"{total} матчей за {elapsed:.1f} c", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from profiler import percentile
+from simulation import GRID_SIZE, SCREEN_HEIGHT, SCREEN_WIDTH, TICK, Simulation
+from waves import roll_kind
+
+ENEMY_COUNTS = [10, 100, 1000]
+TOWER_COUNTS = [5, 50, 200]
+GAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tower_defence3.py")
+
+
+# Набор сценариев "N врагов против M башен" с замером каждой фазы тика.
+# Результат - JSON, чтобы сравнивать замеры между коммитами.
+
+class PhaseTimes:
+    # Собирает времена фаз Simulation.step (см. Simulation.profiler)
+    def __init__(self):
+        self.times = {}
+
+    def add(self, name, seconds):
+        self.times.setdefault(name, []).append(seconds)
+
+
+def summary(values):
+    ms = [v * 1000 for v in values]
+    return {"mean_ms": sum(ms) / len(ms), "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95),
+            "max_ms": max(ms)}
+
+
+def build_scenario(enemies, towers, batched=False, seed=1):
+    # Без волн по расписанию: врагов на поле столько, сколько задано сценарием
+    sim = Simulation("NORMAL", batched=batched, seed=seed, params={"first_wave": 0, "wave_growth": 0, "endless": True})
+    sim.money = sim.lives = 10 ** 9
+    sim.wave_num = 3  # все типы врагов
+
+    # Башни: по кругу чередуем лазер и ракетницу на свободных клетках
+    cells = [(x, y) for y in range(GRID_SIZE // 2, SCREEN_HEIGHT, GRID_SIZE)
+             for x in range(GRID_SIZE // 2, SCREEN_WIDTH, GRID_SIZE)]
+    for x, y in cells:
+        if len(sim.towers) >= towers: break
+        sim.place_tower("BASIC" if len(sim.towers) % 2 == 0 else "SNIPER", x, y)
+
+    # Враги равномерно по пути, с запасом здоровья, чтобы сценарий был устойчивым
+    for i in range(enemies):
+        sim.spawn_enemy()
+        e = sim.enemies[-1]
+        e.hp *= 20
+        set_progress(sim, e, sim.path.length * i / enemies)
+    if sim.horde is not None:
+        sim.horde.advance(0)
+        sim.horde.update_grid(sim.grid)
+    return sim
+
+
+def set_progress(sim, e, dist):
+    if sim.horde is not None:
+        sim.horde.dist[e.slot] = dist
+        return
+    e.dist = dist
+    e.x, e.y = sim.path.position(dist)
+    e.px, e.py = e.x, e.y
+    sim.grid.move(e)
+
+
+def refill(sim, enemies):
+    # Держим число врагов постоянным: убитых и дошедших заменяют новые одним выпуском в фазе spawn
+    missing = enemies - len(sim.enemies) - len(sim.schedule.extra)
+    if missing > 0:
+        sim.schedule.push([roll_kind(sim.rng, sim.wave_num, sim.params) for _ in range(missing)])
+
+
+def run_scenario(enemies, towers, ticks, warmup, batched=False):
+    return measure(build_scenario(enemies, towers, batched), ticks, warmup, enemies)
+
+
+def measure(sim, ticks, warmup, enemies=None):
+    # enemies - держать столько врагов на поле; None - матч идёт как есть (старт из снимка)
+    start_enemies = len(sim.enemies)
+    for _ in range(warmup):
+        if enemies is not None: refill(sim, enemies)
+        sim.step(TICK)
+    sim.drain_changes()
+
+    times = PhaseTimes()
+    sim.profiler = times
+    tick_times = []
+    rockets = 0
+    for _ in range(ticks):
+        if enemies is not None: refill(sim, enemies)
+        start = time.perf_counter()
+        sim.step(TICK)
+        tick_times.append(time.perf_counter() - start)
+        rockets += len(sim.rockets)
+        sim.added.clear()
+        sim.removed.clear()
+    sim.profiler = None
+
+    return {
+        "enemies": enemies if enemies is not None else start_enemies,
+        "towers": len(sim.towers),
+        "batched": sim.horde is not None,
+        "ticks": ticks,
+        "avg_rockets": rockets / ticks,
+        "tick": summary(tick_times),
+        "phases": {name: summary(values) for name, values in times.times.items()},
+    }
+
+
+def run_draw(enemies, towers, frames, batched=False):
+    # Отрисовка в окне arcade (ARCADE_HEADLESS=1 - без экрана); ctx.finish() ждёт видеокарту
+    import tower_defence3
+
+    game = tower_defence3.Game(batched=batched)
+    game.finish_loading()
+    sim = build_scenario(enemies, towers, batched)
+    sim.added, sim.removed = [*sim.towers, *sim.enemies, *sim.rockets], []
+    game.sim = sim
+    game.state = "GAME"
+    game.show_ranges = True
+    frame_times = []
+    for _ in range(frames):
+        refill(sim, enemies)
+        sim.step(TICK)
+        game.sync_sprites(1.0, TICK)
+        start = time.perf_counter()
+        game.on_draw()
+        game.ctx.finish()
+        frame_times.append(time.perf_counter() - start)
+    game.scores.close()
+    game.close()
+    return {"enemies": enemies, "towers": len(sim.towers), "batched": batched, "frames": frames,
+            "draw": summary(frame_times)}
+
+
+def run_startup(runs):
+    # Холодный запуск игры в отдельном процессе: время до окна, первого кадра и готового меню
+    marks = {}
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, GAME, "--startup"], capture_output=True, text=True,
+                             check=True).stdout
+        report = json.loads(out.strip().splitlines()[-1])
+        for name, ms in report.items():
+            if name != "steps": marks.setdefault(name, []).append(ms / 1000)
+    return {"runs": runs, **{name: summary(values) for name, values in marks.items()}}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры тика симуляции и отрисовки")
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--enemies", type=int, nargs="*", default=ENEMY_COUNTS)
+    parser.add_argument("--towers", type=int, nargs="*", default=TOWER_COUNTS)
+    parser.add_argument("--batched", action="store_true", help="пакетный режим врагов (numpy)")
+    parser.add_argument("--draw", action="store_true", help="также замерить on_draw (нужен arcade)")
+    parser.add_argument("--snapshot", help="вместо сценариев - один замер с состояния из снимка матча (snapshot.py)")
+    parser.add_argument("--startup", type=int, default=0, metavar="N",
+                        help="также N раз замерить запуск игры (ARCADE_HEADLESS=1 - без экрана)")
+    parser.add_argument("--out", help="файл для JSON, по умолчанию stdout")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "sim": [],
+        "draw": [],
+    }
+    if args.startup:
+        report["startup"] = run_startup(args.startup)
+        print(f"запуск: первый кадр {report['startup']['first_frame']['mean_ms']:.0f} мс, "
+              f"меню {report['startup']['ready']['mean_ms']:.0f} мс", file=sys.stderr)
+    if args.snapshot:
+        import snapshot
+        sim = snapshot.load(args.snapshot, batched=True if args.batched else None)
+        result = measure(sim, args.ticks, args.warmup)
+        result["snapshot"] = args.snapshot
+        report["sim"].append(result)
+        print(f"снимок {args.snapshot}: тик {result['tick']['mean_ms']:.3f} мс", file=sys.stderr)
+        args.enemies = []
+    for enemies in args.enemies:
+        for towers in args.towers:
+            result = run_scenario(enemies, towers, args.ticks, args.warmup, args.batched)
+            report["sim"].append(result)
+            print(f"{enemies:>5} врагов {result['towers']:>4} башен: "
+                  f"тик {result['tick']['mean_ms']:.3f} мс (p95 {result['tick']['p95_ms']:.3f})", file=sys.stderr)
+            if args.draw:
+                draw = run_draw(enemies, towers, args.ticks, args.batched)
+                report["draw"].append(draw)
+                print(f"{'':>22}кадр {draw['draw']['mean_ms']:.3f} мс", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+HIT = "hit"
+KILL = "kill"
+LEAK = "leak"
+
+
+class EventQueue:
+    # События тика: попадания, убийства и враги, дошедшие до базы.
+    # Урон проходит только через hit(); убитый или дошедший враг сразу помечается неживым
+    # и убирается из сетки, поэтому башни и ракеты его больше не видят,
+    # а из списков он удаляется в конце тика.
+    # listeners - функции, которые получают список событий каждого тика (статистика и т.п.)
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.items = []
+        self.listeners = []
+
+    def hit(self, enemy, damage, source=None):
+        if enemy not in self.grid.keys: return
+        enemy.hp -= damage
+        self.items.append((HIT, enemy, damage, source))
+        if enemy.hp <= 0:
+            self.items.append((KILL, enemy, 0, source))
+            enemy.alive = False
+            self.grid.remove(enemy)
+
+    def leak(self, enemy):
+        if enemy not in self.grid.keys: return
+        self.items.append((LEAK, enemy, 0, None))
+        enemy.alive = False
+        self.grid.remove(enemy)
+
+    def drain(self):
+        items, self.items = self.items, []
+        for listener in self.listeners:
+            listener(items)
+        return items
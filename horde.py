@@ -0,0 +1,195 @@
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для пакетного режима
+    np = None
+
+
+# Пакетный режим: состояние всех врагов хранится в массивах numpy (structure of arrays),
+# движение по пути считается несколькими векторными операциями на тик.
+# Башни и ракеты работают с HordeEnemy - лёгкими "окнами" в строку массива.
+
+class HordeEnemy:
+    __slots__ = ("horde", "slot", "kind", "hp_max", "alive", "_x", "_y", "_px", "_py", "_hp", "_dist")
+
+    def __init__(self, horde, slot, kind, hp_max):
+        self.horde = horde
+        self.slot = slot
+        self.kind = kind
+        self.hp_max = hp_max
+        self.alive = True
+
+    @property
+    def x(self):
+        return self.horde.x[self.slot] if self.slot >= 0 else self._x
+
+    @property
+    def y(self):
+        return self.horde.y[self.slot] if self.slot >= 0 else self._y
+
+    @property
+    def px(self):
+        return self.horde.px[self.slot] if self.slot >= 0 else self._px
+
+    @property
+    def py(self):
+        return self.horde.py[self.slot] if self.slot >= 0 else self._py
+
+    @property
+    def hp(self):
+        return self.horde.hp[self.slot] if self.slot >= 0 else self._hp
+
+    @hp.setter
+    def hp(self, value):
+        if self.slot >= 0:
+            self.horde.hp[self.slot] = value
+        else:
+            self._hp = value
+
+    @property
+    def dist(self):
+        return self.horde.dist[self.slot] if self.slot >= 0 else self._dist
+
+    @property
+    def speed(self):
+        return self.horde.speed[self.slot]
+
+    def reached_end(self):
+        return self.dist >= self.horde.length
+
+    def detach(self):
+        # После удаления из массивов объект ещё может быть целью башни/ракеты
+        h, i = self.horde, self.slot
+        self._x, self._y, self._hp, self._dist = h.x[i], h.y[i], h.hp[i], h.dist[i]
+        self._px, self._py = h.px[i], h.py[i]
+        self.slot = -1
+
+
+class Horde:
+    def __init__(self, path, capacity=256):
+        if np is None:
+            raise RuntimeError("Пакетный режим требует numpy: pip install numpy")
+        # Таблица path.cumulative -> координаты точек, позиция ищется через np.interp
+        self.cumulative = np.array(path.cumulative)
+        self.wx = np.array(path.xs, dtype=np.float64)
+        self.wy = np.array(path.ys, dtype=np.float64)
+        self.length = path.length
+        self.n = 0
+        self.views = []
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        old = getattr(self, "x", None)
+        arrays = {
+            "x": np.zeros(capacity), "y": np.zeros(capacity),
+            "px": np.zeros(capacity), "py": np.zeros(capacity),
+            "speed": np.zeros(capacity), "hp": np.zeros(capacity), "dist": np.zeros(capacity),
+            "cx": np.zeros(capacity, dtype=np.int64), "cy": np.zeros(capacity, dtype=np.int64),
+        }
+        for name, arr in arrays.items():
+            if old is not None:
+                arr[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, arr)
+        self.capacity = capacity
+
+    def add(self, enemy):
+        # enemy - обычный Enemy из simulation.py, из него берутся тип, скорость и здоровье
+        if self.n == self.capacity:
+            self._alloc(self.capacity * 2)
+        i = self.n
+        self.x[i], self.y[i] = enemy.x, enemy.y
+        self.px[i], self.py[i] = enemy.x, enemy.y
+        self.speed[i] = enemy.speed
+        self.hp[i] = enemy.hp
+        self.dist[i] = enemy.dist
+        self.cx[i], self.cy[i] = -1, -1
+        view = HordeEnemy(self, i, enemy.kind, enemy.hp_max)
+        self.views.append(view)
+        self.n += 1
+        return view
+
+    def add_group(self, enemies):
+        # Пачка врагов за тик (выпуск волны): одна запись срезом в каждый массив
+        i, k = self.n, len(enemies)
+        if i + k > self.capacity:
+            capacity = self.capacity
+            while capacity < i + k:
+                capacity *= 2
+            self._alloc(capacity)
+        s = slice(i, i + k)
+        self.x[s] = self.px[s] = [e.x for e in enemies]
+        self.y[s] = self.py[s] = [e.y for e in enemies]
+        self.speed[s] = [e.speed for e in enemies]
+        self.hp[s] = [e.hp for e in enemies]
+        self.dist[s] = [e.dist for e in enemies]
+        self.cx[s] = self.cy[s] = -1
+        views = [HordeEnemy(self, i + j, e.kind, e.hp_max) for j, e in enumerate(enemies)]
+        self.views.extend(views)
+        self.n += k
+        return views
+
+    def remove(self, view):
+        i, last = view.slot, self.n - 1
+        view.detach()
+        if i != last:
+            for arr in (self.x, self.y, self.px, self.py, self.speed, self.hp, self.dist, self.cx, self.cy):
+                arr[i] = arr[last]
+            moved = self.views[last]
+            moved.slot = i
+            self.views[i] = moved
+        self.views.pop()
+        self.n -= 1
+
+    def advance(self, dt):
+        # Тот же шаг, что Enemy.update, но сразу для всех врагов
+        n = self.n
+        if n == 0: return
+        self.px[:n] = self.x[:n]
+        self.py[:n] = self.y[:n]
+        dist = self.dist[:n]
+        np.minimum(dist + self.speed[:n] * dt, self.length, out=dist)
+        self.x[:n] = np.interp(dist, self.cumulative, self.wx)
+        self.y[:n] = np.interp(dist, self.cumulative, self.wy)
+
+    def update_grid(self, grid):
+        # Пересчитываем клетки векторно, в сетке двигаем только сменивших клетку
+        n = self.n
+        if n == 0: return
+        cx = (self.x[:n] // grid.cell_size).astype(np.int64)
+        cy = (self.y[:n] // grid.cell_size).astype(np.int64)
+        changed = np.nonzero((cx != self.cx[:n]) | (cy != self.cy[:n]))[0]
+        self.cx[:n], self.cy[:n] = cx, cy
+        views = self.views
+        for i in changed.tolist():
+            grid.move(views[i])
+
+    def leaked(self):
+        return [self.views[i] for i in np.nonzero(self.dist[:self.n] >= self.length)[0].tolist()]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from simulation import TICK, Simulation
+
+    # Стресс-тест: тысячи живучих врагов на пути и плотная застройка башнями
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for batched in (False, True):
+        sim = Simulation(batched=batched, params={"endless": True})
+        sim.money = sim.lives = 10 ** 9
+        for gx in range(20, 800, 80):
+            for gy in (20, 180, 420, 580):
+                sim.place_tower("BASIC", gx, gy)
+        for i in range(count):
+            sim.spawn_enemy()
+            if i % 100 == 99:
+                for _ in range(10):
+                    sim.step(TICK)
+        for e in sim.enemies:
+            e.hp = 10 ** 9
+        sim.drain_changes()
+        start = time.perf_counter()
+        ticks = 30
+        for _ in range(ticks):
+            sim.step(TICK)
+        ms = (time.perf_counter() - start) * 1000 / ticks
+        print(f"batched={batched}: {len(sim.enemies)} врагов, {len(sim.towers)} башен, {ms:.2f} мс/тик")
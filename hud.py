@@ -0,0 +1,112 @@
+import arcade
+import pyglet
+from arcade.shape_list import ShapeElementList, create_rectangle_filled
+
+from render import GeometryBatch
+
+
+class Label:
+    # Текст пересобирается только когда меняются подставляемые значения
+    def __init__(self, text, template):
+        self.text = text
+        self.template = template
+        self.values = None
+        self.color = None
+
+    def update(self, *values):
+        if values == self.values: return
+        self.values = values
+        self.text.text = self.template.format(*values)
+
+    def set_color(self, color):
+        if color == self.color: return
+        self.color = color
+        self.text.color = color
+
+
+class Screen:
+    # Набор надписей и прямоугольников одного экрана: создаются один раз,
+    # рисуются двумя вызовами - фигуры одним списком, текст одним pyglet batch.
+
+    def __init__(self):
+        self.batch = pyglet.graphics.Batch()
+        self.shapes = ShapeElementList()
+        self.labels = {}
+
+    def __getitem__(self, name):
+        return self.labels[name]
+
+    def text(self, name, template, x, y, color=arcade.color.WHITE, size=16, **kwargs):
+        kwargs.setdefault("font_name", "Arial")
+        text = arcade.Text("", x, y, color, size, batch=self.batch, **kwargs)
+        label = Label(text, template)
+        label.color = color
+        if "{" not in template:
+            label.update()
+        self.labels[name] = label
+        return label
+
+    def rect(self, x, y, w, h, color):
+        self.shapes.append(create_rectangle_filled(x, y, w, h, color))
+
+    def button(self, name, btn, text, color=arcade.color.GRAY, text_color=arcade.color.WHITE):
+        x, y, w, h = btn
+        self.rect(x, y, w, h, color)
+        return self.text(name, text, x, y, text_color, 20, anchor_x="center", anchor_y="center")
+
+    def draw(self):
+        self.shapes.draw()
+        self.batch.draw()
+
+
+class ProfilerOverlay:
+    # Окно профайлера: график времени кадра и перцентили по фазам.
+    # Таблица пересчитывается раз в refresh кадров, график - каждый кадр из буфера профайлера.
+
+    def __init__(self, profiler, x=440, y=540, width=350, rows=14, refresh=15):
+        self.profiler = profiler
+        self.x, self.y = x, y
+        self.width = width
+        self.rows = rows
+        self.refresh = refresh
+        self.graph_h = 60
+        self.budget = 1000 / 60  # мс на кадр при 60 FPS, линия на графике
+        self.frames_left = 0
+        self.graph = GeometryBatch()
+        height = self.graph_h + 30 + 16 * rows
+        self.screen = Screen()
+        self.screen.rect(x + width / 2, y - height / 2, width, height, (0, 0, 0, 180))
+        self.screen.text("title", "F3 скрыть, F4 сохранить | p50 / p95 / max, мс",
+                         x + 5, y - 14, arcade.color.LIGHT_GRAY, 9)
+        for i in range(rows):
+            self.screen.text(f"row{i}", "{}", x + 5, y - self.graph_h - 40 - 16 * i, arcade.color.WHITE, 10,
+                             font_name=("Courier New", "DejaVu Sans Mono", "monospace"))
+
+    def update_rows(self):
+        stats = list(self.profiler.stats().items())
+        for i in range(self.rows):
+            text = ""
+            if i < len(stats):
+                name, (p50, p95, top) = stats[i]
+                text = f"{name:<12}{p50:7.2f}{p95:7.2f}{top:7.2f}"
+            self.screen[f"row{i}"].update(text)
+
+    def draw(self):
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            self.frames_left = self.refresh
+            self.update_rows()
+
+        # Столбец на кадр: 1 px по горизонтали, высота graph_h - два бюджета кадра
+        g = self.graph
+        g.clear()
+        left, bottom = self.x + 5, self.y - 24 - self.graph_h
+        scale = self.graph_h / (2 * self.budget)
+        for i, seconds in enumerate(self.profiler.series("frame", self.width - 10)):
+            ms = seconds * 1000
+            color = arcade.color.GREEN if ms <= self.budget * 1.1 else arcade.color.RED
+            g.add_line(left + i + 0.5, bottom, left + i + 0.5, bottom + min(ms * scale, self.graph_h), color)
+        g.add_line(left, bottom + self.budget * scale, left + self.width - 10, bottom + self.budget * scale,
+                   arcade.color.YELLOW)
+        self.screen.draw()
+        g.draw()
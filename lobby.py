@@ -0,0 +1,176 @@
+import asyncio
+import json
+import math
+import queue
+import sys
+import threading
+import time
+
+import arcade
+
+from assets import get_texture
+from netplay import COMMAND, HELLO, PORT, SCALE, STATE, Mirror, address, frame, read_frame
+from paths import Path, Waypoint
+from render import GeometryBatch
+from simulation import SCREEN_HEIGHT, SCREEN_WIDTH
+from tower_defence3 import BACKGROUND, ENEMY_TEXTURES, ROCKET_TEXTURE, TOWER_TEXTURES
+from world import MapCamera, StaticLayer
+
+# Окно-зритель сетевого матча (экран в лобби) и второй игрок: клик строит выбранную башню
+# или меняет цель башни, как в обычном окне. Матч идёт на сервере: python netplay.py serve
+#
+#   python lobby.py 192.168.0.10:8765
+
+
+class Connection:
+    # Сеть в своём потоке со своим циклом asyncio: окно arcade живёт в цикле pyglet.
+    # Кадры STATE складываются в очередь и применяются к Mirror в главном потоке.
+
+    def __init__(self, host, port):
+        self.frames = queue.SimpleQueue()
+        self.hello = None
+        self.closed = False
+        self.ready = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=asyncio.run, args=(self._main(host, port),), daemon=True)
+        self.thread.start()
+
+    async def _main(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        try:
+            reader, self.writer = await asyncio.open_connection(host, port)
+            kind, payload = await read_frame(reader)
+            if kind != HELLO:
+                raise ValueError("Сервер не прислал HELLO")
+            self.hello = json.loads(payload)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == STATE:
+                    self.frames.put(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.closed = True
+
+    def send(self, *command):
+        data = frame(COMMAND, json.dumps(command).encode("utf-8"))
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+
+
+class LobbyView(arcade.Window):
+    def __init__(self, net):
+        hello = net.hello
+        m = hello["map"]
+        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, f"Космическая Оборона - {m['name']}")
+        self.net = net
+        self.path = Path([Waypoint(x, y) for x, y in m["waypoints"]], m["name"], size=(m["width"], m["height"]))
+        self.camera = MapCamera(SCREEN_WIDTH, SCREEN_HEIGHT, self.path.width, self.path.height)
+        self.static = StaticLayer(self.path, get_texture(BACKGROUND))
+        self.fx = GeometryBatch()
+        self.mirror = Mirror()
+        self.prev = {}  # id -> (x, y) врага в прошлом кадре, позиции интерполируются между кадрами
+        self.frame_dt = hello["send_every"] / hello["tick_rate"]
+        self.tick_rate = hello["tick_rate"]
+        self.received = time.perf_counter()
+        self.sprites = {}
+        self.e = arcade.SpriteList()
+        self.t = arcade.SpriteList()
+        self.b = arcade.SpriteList()
+        self.selected = "BASIC"
+        self.hud = arcade.Text("", 10, SCREEN_HEIGHT - 25, arcade.color.WHITE, 14)
+
+    def on_update(self, dt):
+        while True:
+            try:
+                payload = self.net.frames.get_nowait()
+            except queue.Empty:
+                break
+            self.prev = {net_id: (e[1], e[2]) for net_id, e in self.mirror.enemies.items()}
+            self.mirror.apply(payload)
+            self.received = time.perf_counter()
+        self.sync()
+
+    def _sprite(self, net_id, texture, sprite_list):
+        filename, scale = texture
+        sprite = arcade.Sprite(get_texture(filename), scale)
+        sprite_list.append(sprite)
+        self.sprites[net_id] = sprite
+        return sprite
+
+    def sync(self):
+        mirror = self.mirror
+        for net_id in [k for k in self.sprites if k not in mirror.enemies and k not in mirror.towers
+                       and k not in mirror.rockets]:
+            self.sprites.pop(net_id).remove_from_sprite_lists()
+        alpha = min(1.0, (time.perf_counter() - self.received) / self.frame_dt)
+        for net_id, (kind, x, y, _) in mirror.enemies.items():
+            sprite = self.sprites.get(net_id) or self._sprite(net_id, ENEMY_TEXTURES[kind], self.e)
+            px, py = self.prev.get(net_id, (x, y))
+            sprite.center_x = (px + (x - px) * alpha) / SCALE
+            sprite.center_y = (py + (y - py) * alpha) / SCALE
+        for net_id, (kind, x, y, angle, _) in mirror.towers.items():
+            sprite = self.sprites.get(net_id) or self._sprite(net_id, TOWER_TEXTURES[kind], self.t)
+            sprite.center_x, sprite.center_y = x / SCALE, y / SCALE
+            if angle is not None: sprite.angle = angle / 100
+        # Ракеты клиент ведёт сам по точке встречи; позиция отстаёт на кадр, как у врагов
+        tick = mirror.tick - (1 - alpha) * self.frame_dt * self.tick_rate
+        for net_id, (x, y, tx, ty, _, _) in mirror.rockets.items():
+            sprite = self.sprites.get(net_id)
+            if sprite is None:
+                sprite = self._sprite(net_id, ROCKET_TEXTURE, self.b)
+                sprite.angle = math.degrees(math.atan2(ty - y, tx - x)) - 90
+            sprite.center_x, sprite.center_y = mirror.rocket_position(net_id, max(tick, mirror.rockets[net_id][5]))
+
+    def on_draw(self):
+        self.clear()
+        self.camera.use()
+        self.static.draw(self.camera.view())
+        self.t.draw()
+        self.fx.clear()
+        for _, x, y, _, target in self.mirror.towers.values():
+            enemy = self.sprites.get(target) if target else None
+            if enemy is not None:
+                self.fx.add_line(x / SCALE, y / SCALE, enemy.center_x, enemy.center_y, arcade.color.CYAN, 3)
+                self.fx.add_circle_filled(enemy.center_x, enemy.center_y, 5, arcade.color.CYAN)
+        self.fx.draw()
+        self.e.draw()
+        self.b.draw()
+        self.default_camera.use()
+        m = self.mirror
+        status = {"GAME": "", "WIN": " - ПОБЕДА", "GAMEOVER": " - ПОРАЖЕНИЕ"}[m.state]
+        if self.net.closed and m.state == "GAME": status = " - соединение потеряно"
+        self.hud.text = (f"Золото: {m.money}  Жизни: {m.lives}  Волна: {m.wave}  Счет: {m.score}  "
+                         f"[{'Лазер' if self.selected == 'BASIC' else 'Ракетница'}]{status}")
+        self.hud.draw()
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        if button == arcade.MOUSE_BUTTON_LEFT and not self.net.closed:
+            wx, wy = self.camera.to_world(x, y)
+            self.net.send("click", self.selected, math.floor(wx), math.floor(wy))
+
+    def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
+        if buttons & (arcade.MOUSE_BUTTON_RIGHT | arcade.MOUSE_BUTTON_MIDDLE):
+            self.camera.pan(dx, dy)
+
+    def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
+        self.camera.zoom_at(x, y, 1.1 ** scroll_y)
+
+    def on_key_press(self, key, modifiers):
+        if key == arcade.key.KEY_1:
+            self.selected = "BASIC"
+        elif key == arcade.key.KEY_2:
+            self.selected = "SNIPER"
+
+
+if __name__ == "__main__":
+    host, port = address(sys.argv[1]) if len(sys.argv) > 1 else ("127.0.0.1", PORT)
+    net = Connection(host, port)
+    net.ready.wait()
+    if net.error:
+        print(f"Не удалось подключиться к {host}:{port}: {net.error}")
+        sys.exit(1)
+    LobbyView(net).run()
@@ -0,0 +1,550 @@
+import argparse
+import asyncio
+import json
+import math
+import struct
+import sys
+import time
+from array import array
+
+from paths import DEFAULT_MAP, load_map
+from replay import save_log
+from simulation import DIFFICULTIES, ENEMY_TYPES, SIM_RATE, TICK, TOWER_TYPES, Simulation, Tower
+from waves import STRESS
+
+PORT = 8765
+SEND_EVERY = 2  # рассылка каждый второй тик - 30 раз в секунду
+SCALE = 4  # координаты передаются целыми, в четвертях пикселя
+MAX_BUFFER = 1 << 20  # клиент, у которого скопилось больше неотправленного, отключается
+MAX_COMMAND = 4096  # кадр от клиента длиннее - клиент отключается, не дочитывая его
+
+HELLO = 1
+STATE = 2
+COMMAND = 3
+
+FULL = 1  # флаг кадра STATE: состояние целиком (для нового клиента), а не разница
+
+STATES = ("GAME", "WIN", "GAMEOVER")
+ENEMY_KINDS = sorted(ENEMY_TYPES)
+TOWER_KINDS = sorted(TOWER_TYPES)
+
+# Матч по локальной сети: сервер ведёт симуляцию сам и рассылает состояние всем клиентам,
+# клиенты (экраны в лобби, второй игрок) присылают только команды.
+#
+# Кадр: тип (B) и длина (I), дальше содержимое. HELLO и COMMAND - JSON, STATE - двоичный:
+#   заголовок: флаги, тик, золото, жизни, счёт, волна, состояние матча
+#   удалённые id (враги, башни, ракеты)
+#   новые враги: id, тип, x, y, hp
+#   сдвиги остальных врагов: по байту на dx и dy в порядке появления врагов; -128 - см. прыжки
+#   прыжки (сдвиг не влез в байт): id, x, y;  изменения hp: id, hp
+#   новые башни: id, тип, x, y;  башни с новым углом или целью: id, угол, id цели (0 - не стреляет)
+#   новые ракеты: id, x, y, точка встречи, время полёта, тик выстрела - дальше клиент ведёт их сам
+# Сервер и клиенты держат одинаковый Mirror - то, что уже разослано; разница считается от него.
+
+FRAME = struct.Struct("<BI")
+HEADER = struct.Struct("<BIqqqIB")
+COUNT = struct.Struct("<H")
+ENEMY = struct.Struct("<IBHHf")
+JUMP = struct.Struct("<IHH")
+HP = struct.Struct("<If")
+TOWER = struct.Struct("<IBHH")
+AIM = struct.Struct("<IHI")
+ROCKET = struct.Struct("<IHHHHfI")
+
+
+def q(value):
+    return int(round(value * SCALE))
+
+
+def f32(value):
+    # hp и время передаются во float32 - и сравниваются в той же точности
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def frame(kind, payload):
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader, limit=None):
+    kind, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if limit is not None and size > limit:
+        raise ValueError(f"Кадр {size} байт больше допустимого ({limit})")
+    return kind, await reader.readexactly(size)
+
+
+def _coord(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def valid_command(command):
+    # Команды клиентов приходят по сети как есть - принимаются только известные и с правильными аргументами
+    if not isinstance(command, list) or not command: return False
+    action, *args = command
+    if action in ("click", "place"):
+        return len(args) == 3 and isinstance(args[0], str) and args[0] in TOWER_TYPES and all(map(_coord, args[1:]))
+    if action == "policy":
+        return len(args) == 2 and all(map(_coord, args))
+    return False
+
+
+def _pack(out, fmt, rows):
+    out += COUNT.pack(len(rows))
+    for row in rows:
+        out += fmt.pack(*row)
+
+
+def _unpack(data, pos, fmt):
+    (n,) = COUNT.unpack_from(data, pos)
+    pos += COUNT.size
+    return [fmt.unpack_from(data, pos + i * fmt.size) for i in range(n)], pos + n * fmt.size
+
+
+def _ids(data, pos, size=4, code="I"):
+    (n,) = COUNT.unpack_from(data, pos)
+    pos += COUNT.size
+    return array(code, data[pos:pos + size * n]), pos + size * n
+
+
+class Mirror:
+    # Разосланное состояние матча, координаты - в единицах SCALE.
+    # enemies: id -> [тип, x, y, hp] в порядке появления (в нём же идут сдвиги)
+    # towers: id -> [тип, x, y, угол, цель]; rockets: id -> [x, y, tx, ty, время полёта, тик выстрела]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.tick = 0
+        self.money = self.lives = self.score = self.wave = 0
+        self.state = "GAME"
+        self.enemies = {}
+        self.towers = {}
+        self.rockets = {}
+
+    def header(self, flags):
+        return HEADER.pack(flags, self.tick, self.money, self.lives, self.score, self.wave, STATES.index(self.state))
+
+    def remove(self, net_id):
+        for table in (self.enemies, self.towers, self.rockets):
+            if table.pop(net_id, None) is not None: return
+
+    def rocket_position(self, net_id, tick):
+        x, y, tx, ty, duration, start = self.rockets[net_id]
+        k = min(1.0, (tick - start) / SIM_RATE / duration) if duration > 0 else 1.0
+        return (x + (tx - x) * k) / SCALE, (y + (ty - y) * k) / SCALE
+
+    def digest(self):
+        # Сверка клиента с сервером (selftest)
+        return hash((self.tick, self.money, self.lives, self.score, self.wave, self.state,
+                     *(tuple((k, tuple(v)) for k, v in table.items())
+                       for table in (self.enemies, self.towers, self.rockets))))
+
+    def apply(self, data):
+        # Кадр STATE на стороне клиента; Encoder.encode приводит сервер к тому же состоянию
+        flags, tick, money, lives, score, wave, state = HEADER.unpack_from(data, 0)
+        if flags & FULL:
+            self.reset()
+        self.tick, self.money, self.lives, self.score, self.wave = tick, money, lives, score, wave
+        self.state = STATES[state]
+        gone, pos = _ids(data, HEADER.size)
+        for net_id in gone:
+            self.remove(net_id)
+        spawned, pos = _unpack(data, pos, ENEMY)
+        moves, pos = _ids(data, pos, 2, "b")
+        for i, e in enumerate(self.enemies.values()):
+            dx = moves[2 * i]
+            if dx != -128:
+                e[1] += dx
+                e[2] += moves[2 * i + 1]
+        jumps, pos = _unpack(data, pos, JUMP)
+        for net_id, x, y in jumps:
+            self.enemies[net_id][1:3] = [x, y]
+        hps, pos = _unpack(data, pos, HP)
+        for net_id, hp in hps:
+            self.enemies[net_id][3] = hp
+        for net_id, kind, x, y, hp in spawned:
+            self.enemies[net_id] = [ENEMY_KINDS[kind], x, y, hp]
+        towers, pos = _unpack(data, pos, TOWER)
+        for net_id, kind, x, y in towers:
+            self.towers[net_id] = [TOWER_KINDS[kind], x, y, None, 0]
+        aims, pos = _unpack(data, pos, AIM)
+        for net_id, angle, target in aims:
+            self.towers[net_id][3:5] = [angle, target]
+        rockets, pos = _unpack(data, pos, ROCKET)
+        for net_id, *row in rockets:
+            self.rockets[net_id] = row
+
+
+class Encoder:
+    # Серверная сторона протокола: id объектов симуляции и такой же Mirror, как у клиентов.
+    # encode() собирает разницу с прошлой рассылки и сразу переводит base в новое состояние.
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.base = Mirror()
+        self.ids = {}  # объект симуляции -> id
+        self.enemies = {}  # id -> враг, в порядке base.enemies
+        self.next_id = 1
+
+    def _aim(self, tower):
+        t = tower.current_target
+        target = self.ids.get(t, 0) if tower.is_firing and t is not None and t.alive else 0
+        return int(round(tower.angle % 360 * 100)) % 36000, target
+
+    def encode(self):
+        sim, base, ids = self.sim, self.base, self.ids
+        added, removed = sim.drain_changes()
+        base.tick, base.money, base.lives = sim.ticks, sim.money, sim.lives
+        base.score, base.wave = sim.score, sim.wave_num
+        base.state = sim.state
+        out = bytearray(base.header(0))
+
+        gone = []
+        for m in removed:
+            net_id = ids.pop(m, None)
+            if net_id is None: continue  # появился и исчез между рассылками - клиентам не нужен
+            gone.append(net_id)
+            base.remove(net_id)
+            self.enemies.pop(net_id, None)
+        out += COUNT.pack(len(gone)) + array("I", gone).tobytes()
+
+        new_enemies, new_towers, new_rockets = [], [], []
+        for m in added:
+            if not m.alive: continue
+            ids[m] = self.next_id
+            self.next_id += 1
+            if isinstance(m, Tower):
+                new_towers.append(m)
+            elif hasattr(m, "hp_max"):
+                new_enemies.append(m)
+            else:
+                new_rockets.append(m)
+
+        # Сдвиги и hp - для врагов, которые у клиентов уже есть
+        moves = array("b", bytes(2 * len(base.enemies)))
+        jumps, hps = [], []
+        for i, (net_id, e) in enumerate(base.enemies.items()):
+            m = self.enemies[net_id]
+            x, y = q(m.x), q(m.y)
+            dx, dy = x - e[1], y - e[2]
+            if -127 <= dx <= 127 and -127 <= dy <= 127:
+                moves[2 * i], moves[2 * i + 1] = dx, dy
+            else:
+                moves[2 * i] = -128
+                jumps.append((net_id, x, y))
+            e[1], e[2] = x, y
+            hp = f32(m.hp)
+            if hp != e[3]:
+                e[3] = hp
+                hps.append((net_id, hp))
+
+        spawned = []
+        for m in new_enemies:
+            net_id = ids[m]
+            e = base.enemies[net_id] = [m.kind, q(m.x), q(m.y), f32(m.hp)]
+            self.enemies[net_id] = m
+            spawned.append((net_id, ENEMY_KINDS.index(m.kind), *e[1:]))
+        _pack(out, ENEMY, spawned)
+        out += COUNT.pack(len(moves) // 2) + moves.tobytes()
+        _pack(out, JUMP, jumps)
+        _pack(out, HP, hps)
+
+        rows = []
+        for m in new_towers:
+            net_id = ids[m]
+            base.towers[net_id] = [m.kind, q(m.x), q(m.y), None, 0]
+            rows.append((net_id, TOWER_KINDS.index(m.kind), q(m.x), q(m.y)))
+        _pack(out, TOWER, rows)
+        aims = []
+        for m in sim.towers:
+            net_id = ids.get(m)
+            if net_id is None: continue
+            angle, target = self._aim(m)
+            t = base.towers[net_id]
+            if t[3] != angle or t[4] != target:
+                t[3], t[4] = angle, target
+                aims.append((net_id, angle, target))
+        _pack(out, AIM, aims)
+
+        rows = []
+        for m in new_rockets:
+            net_id = ids[m]
+            row = base.rockets[net_id] = [q(m.x), q(m.y), q(m.tx), q(m.ty), f32(m.time_left), base.tick]
+            rows.append((net_id, *row))
+        _pack(out, ROCKET, rows)
+        return bytes(out)
+
+    def keyframe(self):
+        # Всё разосланное как один кадр - новому клиенту; base не меняется
+        base = self.base
+        out = bytearray(base.header(FULL))
+        out += COUNT.pack(0)
+        _pack(out, ENEMY, [(net_id, ENEMY_KINDS.index(kind), x, y, hp)
+                           for net_id, (kind, x, y, hp) in base.enemies.items()])
+        out += COUNT.pack(0)
+        _pack(out, JUMP, [])
+        _pack(out, HP, [])
+        _pack(out, TOWER, [(net_id, TOWER_KINDS.index(t[0]), t[1], t[2]) for net_id, t in base.towers.items()])
+        _pack(out, AIM, [(net_id, t[3], t[4]) for net_id, t in base.towers.items() if t[3] is not None])
+        _pack(out, ROCKET, [(net_id, *row) for net_id, row in base.rockets.items()])
+        return bytes(out)
+
+
+class MatchServer:
+    # Матч идёт на сервере в реальном времени; команды клиентов применяются между тиками
+    # через sim.command - как клики в окне, поэтому матч можно сохранить журналом (record).
+
+    def __init__(self, sim, map_file=DEFAULT_MAP, send_every=SEND_EVERY, record=False):
+        self.sim = sim
+        self.map_file = map_file
+        self.send_every = send_every
+        self.record = record
+        self.encoder = Encoder(sim)
+        self.clients = []
+        self.joining = []  # получат кадр целиком на ближайшей рассылке
+        self.commands = []
+        self.bytes_sent = 0
+        self.on_broadcast = None  # функция(тик, Mirror) после каждой рассылки (selftest)
+
+    def hello(self):
+        sim, path = self.sim, self.sim.path
+        return json.dumps({
+            "difficulty": sim.difficulty, "params": sim.overrides, "seed": sim.seed,
+            "map": {"name": path.name, "width": path.width, "height": path.height,
+                    "waypoints": [[w.x, w.y] for w in path.waypoints]},
+            "tick_rate": SIM_RATE, "send_every": self.send_every, "scale": SCALE,
+            "enemies": ENEMY_KINDS, "towers": TOWER_KINDS,
+        }).encode("utf-8")
+
+    async def handle(self, reader, writer):
+        writer.write(frame(HELLO, self.hello()))
+        self.joining.append(writer)
+        try:
+            while True:
+                kind, payload = await read_frame(reader, MAX_COMMAND)
+                if kind == COMMAND:
+                    self.commands.append(json.loads(payload))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.drop(writer)
+
+    def drop(self, writer):
+        for group in (self.clients, self.joining):
+            if writer in group: group.remove(writer)
+        writer.close()
+
+    def apply(self, command):
+        # ["click", тип, x, y] - как левый клик в окне: по башне - сменить цель, иначе построить;
+        # ["place", тип, x, y] и ["policy", x, y] - как sim.command. Остальное игнорируется.
+        # Команда проверяется до sim.command: всё, что туда попало, пишется в журнал повтора.
+        if not valid_command(command):
+            print(f"Неверная команда: {command}", file=sys.stderr)
+            return
+        action, *args = command
+        if action == "click":
+            kind, x, y = args
+            if self.sim.tower_at(x, y):
+                self.sim.command("policy", x, y)
+            else:
+                self.sim.command("place", kind, x, y)
+        else:
+            self.sim.command(action, *args)
+
+    def broadcast(self):
+        data = frame(STATE, self.encoder.encode())
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+                print("Клиент не успевает за рассылкой - отключён", file=sys.stderr)
+                self.drop(writer)
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+        if self.joining:
+            key = frame(STATE, self.encoder.keyframe())
+            for writer in self.joining:
+                writer.write(key)
+                self.bytes_sent += len(key)
+            self.clients += self.joining
+            self.joining = []
+        if self.on_broadcast:
+            self.on_broadcast(self.encoder.base)
+
+    async def run(self, max_ticks=None):
+        # Фиксированный шаг по часам цикла; отставание больше четверти секунды не догоняется
+        loop = asyncio.get_running_loop()
+        sim = self.sim
+        next_time = loop.time()
+        while sim.state == "GAME" and (max_ticks is None or sim.ticks < max_ticks):
+            for command in self.commands:
+                self.apply(command)
+            self.commands.clear()
+            sim.step(TICK)
+            if sim.ticks % self.send_every == 0 or sim.state != "GAME":
+                self.broadcast()
+            next_time += TICK
+            delay = next_time - loop.time()
+            if delay < -0.25:
+                next_time = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+        if self.record:
+            print(f"Журнал матча: {save_log(sim, self.map_file)}")
+
+    async def serve(self, host="0.0.0.0", port=PORT, max_ticks=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"Сервер матча на {host}:{self.port}, {self.sim.difficulty}, карта {self.sim.path.name}")
+        async with server:
+            await self.run(max_ticks)
+            for writer in self.clients + self.joining:
+                await writer.drain()
+                writer.close()
+
+
+class Spectator:
+    # Клиент без окна: держит Mirror матча и может отправлять команды.
+
+    def __init__(self):
+        self.mirror = Mirror()
+        self.hello = None
+        self.frames = 0
+        self.bytes = 0
+        self.writer = None
+
+    async def connect(self, host="127.0.0.1", port=PORT):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        kind, payload = await read_frame(self.reader)
+        if kind != HELLO:
+            raise ValueError("Сервер не прислал HELLO")
+        self.hello = json.loads(payload)
+        self.bytes += FRAME.size + len(payload)
+        return self.hello
+
+    def send(self, *command):
+        self.writer.write(frame(COMMAND, json.dumps(command).encode("utf-8")))
+
+    def click(self, kind, x, y):
+        self.send("click", kind, x, y)
+
+    async def follow(self, on_frame=None):
+        # Читает кадры до конца матча или обрыва соединения
+        try:
+            while True:
+                kind, payload = await read_frame(self.reader)
+                if kind != STATE: continue
+                self.mirror.apply(payload)
+                self.frames += 1
+                self.bytes += FRAME.size + len(payload)
+                if on_frame: on_frame(self.mirror)
+                if self.mirror.state != "GAME": break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.writer.close()
+
+
+def make_sim(args):
+    path = load_map(args.map)
+    return Simulation(args.difficulty, path, batched=args.batched, params=STRESS if args.stress else None)
+
+
+async def selftest(args):
+    # Сервер и несколько клиентов на localhost: каждый кадр каждого клиента сверяется с сервером,
+    # сервер - с симуляцией (координаты с точностью до 1/SCALE пикселя)
+    sim = make_sim(args)
+    server = MatchServer(sim, args.map, record=args.record)
+    digests, errors = {}, []
+
+    def check(base):
+        digests[base.tick] = base.digest()
+        for net_id, m in server.encoder.enemies.items():
+            _, x, y, hp = base.enemies[net_id]
+            if abs(x / SCALE - m.x) > 0.5 / SCALE or abs(y / SCALE - m.y) > 0.5 / SCALE or hp != f32(m.hp):
+                errors.append(f"тик {base.tick}: враг {net_id} расходится с симуляцией")
+
+    server.on_broadcast = check
+    task = asyncio.create_task(server.serve("127.0.0.1", 0, max_ticks=int(args.seconds * SIM_RATE)))
+    await asyncio.sleep(0.1)
+    clients = []
+    for i in range(args.clients):
+        c = Spectator()
+        await c.connect("127.0.0.1", server.port)
+        clients.append(c)
+        await asyncio.sleep(0.2)  # подключаются в разное время - проверяем и кадр целиком
+
+    def verify(mirror):
+        if digests.get(mirror.tick) != mirror.digest():
+            errors.append(f"тик {mirror.tick}: клиент расходится с сервером")
+
+    # Первый клиент - второй игрок: строит лазеры вдоль пути
+    player = clients[0]
+    for x in range(100, 800, 80):
+        player.click("BASIC", x, 200)
+    player.click("SNIPER", 100, 400)
+    start = time.perf_counter()
+    await asyncio.gather(task, *(c.follow(verify) for c in clients))
+    elapsed = time.perf_counter() - start
+    base = server.encoder.base
+    print(f"тиков {sim.ticks}, башен {len(sim.towers)} (у клиентов {len(clients[0].mirror.towers)}), "
+          f"врагов {len(sim.enemies)}, волна {sim.wave_num}")
+    for i, c in enumerate(clients):
+        print(f"клиент {i}: кадров {c.frames}, {c.bytes * 8 / elapsed / 1000:.1f} кбит/с, "
+              f"совпадает с сервером: {c.mirror.digest() == base.digest()}")
+    print(f"разослано {server.bytes_sent / 1024:.1f} КиБ, ошибок {len(errors)}")
+    for e in errors[:10]:
+        print(e)
+    return not errors
+
+
+async def watch(args):
+    c = Spectator()
+    hello = await c.connect(*args.address)
+    print(f"Подключено: {hello['difficulty']}, карта {hello['map']['name']}")
+    if args.click:
+        c.click(args.click[0], int(args.click[1]), int(args.click[2]))
+    start = last = time.perf_counter()
+
+    def report(mirror):
+        nonlocal last
+        now = time.perf_counter()
+        if now - last >= 1.0:
+            last = now
+            print(f"тик {mirror.tick}: волна {mirror.wave}, врагов {len(mirror.enemies)}, башен {len(mirror.towers)}, "
+                  f"ракет {len(mirror.rockets)}, {c.bytes * 8 / (now - start) / 1000:.1f} кбит/с")
+
+    await c.follow(report)
+    print(f"Матч окончен: {c.mirror.state}, счёт {c.mirror.score}")
+
+
+def address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port or PORT)
+
+
+def main():
+    # python netplay.py serve [--port 8765] [--map ...] [--difficulty HARD] [--batched] [--stress] [--record]
+    # python netplay.py watch 192.168.0.10:8765 [--click BASIC 100 200]
+    # python netplay.py selftest [--clients 4] [--seconds 10] [--stress]
+    parser = argparse.ArgumentParser(description="Матч по локальной сети: сервер и клиент без окна")
+    parser.add_argument("mode", choices=("serve", "watch", "selftest"))
+    parser.add_argument("address", nargs="?", type=address, default=("127.0.0.1", PORT))
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--map", default=DEFAULT_MAP)
+    parser.add_argument("--difficulty", default="NORMAL", choices=list(DIFFICULTIES))
+    parser.add_argument("--batched", action="store_true")
+    parser.add_argument("--stress", action="store_true", help="волны waves.STRESS")
+    parser.add_argument("--record", action="store_true", help="сохранить журнал матча в replays/")
+    parser.add_argument("--click", nargs=3, metavar=("KIND", "X", "Y"), help="клик второго игрока")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        asyncio.run(MatchServer(make_sim(args), args.map, record=args.record).serve(port=args.port))
+    elif args.mode == "watch":
+        asyncio.run(watch(args))
+    else:
+        sys.exit(0 if asyncio.run(selftest(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
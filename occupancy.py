@@ -0,0 +1,55 @@
+FREE = 0
+PATH = 1
+TOWER = 2
+
+
+class OccupancyGrid:
+    # Карта клеток для строительства: свободна / занята путём / занята башней.
+    # Путь размечается один раз при загрузке карты, дальше проверка клетки - одно чтение из bytearray.
+
+    def __init__(self, path, width, height, cell_size, margin=20):
+        self.cell_size = cell_size
+        self.cols = -(-int(width) // cell_size)
+        self.rows = -(-int(height) // cell_size)
+        self.cells = bytearray(self.cols * self.rows)
+        self.towers = {}  # индекс клетки -> башня
+        self.mark_path(path, margin)
+
+    def mark_path(self, path, margin):
+        # Клетка занята, если её центр попал в рамку отрезка пути, расширенную на margin
+        half = self.cell_size // 2
+        for p1, p2 in zip(path.waypoints, path.waypoints[1:]):
+            x0, x1 = min(p1.x, p2.x) - margin, max(p1.x, p2.x) + margin
+            y0, y1 = min(p1.y, p2.y) - margin, max(p1.y, p2.y) + margin
+            c0 = max(0, -int(-(x0 - half) // self.cell_size))
+            c1 = min(self.cols - 1, int((x1 - half) // self.cell_size))
+            r0 = max(0, -int(-(y0 - half) // self.cell_size))
+            r1 = min(self.rows - 1, int((y1 - half) // self.cell_size))
+            for row in range(r0, r1 + 1):
+                base = row * self.cols
+                for col in range(c0, c1 + 1):
+                    self.cells[base + col] = PATH
+
+    def snap(self, x, y):
+        # Центр клетки под точкой
+        cs = self.cell_size
+        return (x // cs) * cs + cs // 2, (y // cs) * cs + cs // 2
+
+    def index(self, x, y):
+        col, row = int(x // self.cell_size), int(y // self.cell_size)
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row * self.cols + col
+        return None
+
+    def is_free(self, x, y):
+        i = self.index(x, y)
+        return i is not None and self.cells[i] == FREE
+
+    def tower_at(self, x, y):
+        i = self.index(x, y)
+        return self.towers.get(i) if i is not None else None
+
+    def occupy(self, tower):
+        i = self.index(tower.x, tower.y)
+        self.cells[i] = TOWER
+        self.towers[i] = tower
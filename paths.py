@@ -0,0 +1,88 @@
+import json
+import math
+import os
+from dataclasses import dataclass
+
+MAPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps")
+DEFAULT_MAP = os.path.join(MAPS_DIR, "default.json")
+DEFAULT_SIZE = (800, 600)  # размер поля, если в файле карты он не указан
+
+
+@dataclass
+class Waypoint:
+    x: float
+    y: float
+
+
+class Path:
+    # Путь, параметризованный длиной дуги: положение врага задаётся одним числом -
+    # пройденным расстоянием dist. Длины отрезков считаются один раз при загрузке.
+
+    def __init__(self, waypoints, name="", step=1.0, size=DEFAULT_SIZE, file=None):
+        if len(waypoints) < 2:
+            raise ValueError("Путь должен содержать хотя бы две точки")
+        self.name = name
+        self.file = file  # файл карты, если путь загружен из него (пишется в журнал повтора)
+        self.waypoints = waypoints
+        self.step = step
+        self.width, self.height = size
+
+        self.xs = [w.x for w in waypoints]
+        self.ys = [w.y for w in waypoints]
+        self.cumulative = [0.0]
+        self.ux = []
+        self.uy = []
+        for p1, p2 in zip(waypoints, waypoints[1:]):
+            seg = math.hypot(p2.x - p1.x, p2.y - p1.y)
+            self.ux.append((p2.x - p1.x) / seg if seg else 0.0)
+            self.uy.append((p2.y - p1.y) / seg if seg else 0.0)
+            self.cumulative.append(self.cumulative[-1] + seg)
+        self.length = self.cumulative[-1]
+        self.end = (self.xs[-1], self.ys[-1])
+
+        # Таблица: номер отрезка для каждого шага длины step
+        self.seg_table = []
+        seg = 0
+        for i in range(int(self.length / step) + 1):
+            while seg < len(self.ux) - 1 and i * step >= self.cumulative[seg + 1]:
+                seg += 1
+            self.seg_table.append(seg)
+
+    def position(self, dist):
+        if dist >= self.length: return self.end
+        if dist <= 0: return self.xs[0], self.ys[0]
+        seg = self.seg_table[int(dist / self.step)]
+        while dist > self.cumulative[seg + 1]:
+            seg += 1
+        t = dist - self.cumulative[seg]
+        return self.xs[seg] + self.ux[seg] * t, self.ys[seg] + self.uy[seg] * t
+
+    def ranges_within(self, cx, cy, radius):
+        # Участки пути [d0, d1] (по длине дуги), лежащие внутри круга.
+        # Враг всегда на пути, поэтому "в радиусе башни" == "dist попал в один из участков".
+        bands = []
+        r2 = radius * radius
+        for i in range(len(self.ux)):
+            ax, ay = self.xs[i] - cx, self.ys[i] - cy
+            seg = self.cumulative[i + 1] - self.cumulative[i]
+            b = ax * self.ux[i] + ay * self.uy[i]
+            disc = b * b - (ax * ax + ay * ay - r2)
+            if disc < 0: continue
+            root = math.sqrt(disc)
+            t0, t1 = max(-b - root, 0.0), min(-b + root, seg)
+            if t0 > t1: continue
+            d0, d1 = self.cumulative[i] + t0, self.cumulative[i] + t1
+            if bands and d0 <= bands[-1][1] + 1e-9:
+                bands[-1] = (bands[-1][0], d1)
+            else:
+                bands.append((d0, d1))
+        return bands
+
+
+def load_map(filename=DEFAULT_MAP):
+    # Формат: {"name": "...", "width": 800, "height": 600, "waypoints": [[x, y], ...]}
+    with open(filename, encoding="utf-8") as f:
+        data = json.load(f)
+    waypoints = [Waypoint(float(x), float(y)) for x, y in data["waypoints"]]
+    size = data.get("width", DEFAULT_SIZE[0]), data.get("height", DEFAULT_SIZE[1])
+    return Path(waypoints, data.get("name", os.path.basename(filename)), size=size, file=filename)
@@ -0,0 +1,125 @@
+import csv
+import json
+import os
+from datetime import datetime
+from time import perf_counter
+
+PROFILES_DIR = "profiles"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values: return 0.0
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+class FrameProfiler:
+    # Кольцевой буфер последних кадров: для каждого кадра - секунды по фазам.
+    # Фазы симуляции приходят через Simulation.profiler (add), фазы окна - через mark.
+    # Выключенный профайлер ничего не замеряет: Game проверяет enabled один раз за колбэк.
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.frames = [None] * capacity
+        self.count = 0  # всего записано кадров, позиция в буфере - count % capacity
+        self.enabled = False
+        self.phases = []  # порядок появления фаз, для вывода
+        self.current = {}
+        self.frame_start = None
+        self.last = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        # Пауза между выключением и включением не должна попасть в кадр
+        self.frame_start = None
+        self.current = {}
+
+    def begin_frame(self):
+        # Закрывает предыдущий кадр: "frame" - полное время между кадрами, включая ожидание vsync
+        now = perf_counter()
+        if self.frame_start is not None:
+            self.current["frame"] = now - self.frame_start
+            self.frames[self.count % self.capacity] = self.current
+            self.count += 1
+        self.current = {}
+        self.frame_start = self.last = now
+
+    def start(self):
+        self.last = perf_counter()
+
+    def mark(self, name):
+        # Время с прошлой отметки (или start) записывается в фазу name
+        now = perf_counter()
+        self.add(name, now - self.last)
+        self.last = now
+
+    def add(self, name, seconds):
+        current = self.current
+        if name in current:
+            current[name] += seconds
+        else:
+            current[name] = seconds
+            if name not in self.phases: self.phases.append(name)
+
+    def recent(self):
+        # Записанные кадры от старых к новым
+        n = min(self.count, self.capacity)
+        start = self.count - n
+        return [self.frames[i % self.capacity] for i in range(start, self.count)]
+
+    def series(self, name, n=None):
+        frames = self.recent()
+        if n is not None: frames = frames[-n:]
+        return [f.get(name, 0.0) for f in frames]
+
+    def stats(self):
+        # {фаза: (p50, p95, max)} в миллисекундах; фазы без замера в кадре считаются нулём
+        frames = self.recent()
+        result = {}
+        for name in ["frame", *self.phases]:
+            ms = [f.get(name, 0.0) * 1000 for f in frames]
+            if ms: result[name] = (percentile(ms, 50), percentile(ms, 95), max(ms))
+        return result
+
+    def save(self, filename=None):
+        # Пишет два файла: CSV по кадрам и JSON со сводкой и теми же кадрами
+        if filename is None:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            filename = os.path.join(PROFILES_DIR, datetime.now().strftime("profile_%Y%m%d_%H%M%S"))
+        columns = ["frame", *self.phases]
+        frames = self.recent()
+        with open(filename + ".csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["index", *(c + "_ms" for c in columns)])
+            first = self.count - len(frames)
+            for i, frame in enumerate(frames):
+                writer.writerow([first + i, *(f"{frame.get(c, 0.0) * 1000:.4f}" for c in columns)])
+        with open(filename + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "frames": len(frames),
+                "stats_ms": {name: dict(zip(("p50", "p95", "max"), s)) for name, s in self.stats().items()},
+                "phases": columns,
+                "data_ms": [[frame.get(c, 0.0) * 1000 for c in columns] for frame in frames],
+            }, f)
+        return filename
+
+
+class StartupTimer:
+    # Время запуска по этапам: секунды от start (perf_counter до импорта arcade) до отметки.
+    # Повторная отметка с тем же именем не перезаписывает первую.
+
+    def __init__(self, start):
+        self.start = start
+        self.marks = {}
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = perf_counter() - self.start
+
+    def report(self, steps=None):
+        # steps - длительности шагов загрузки (Loader.times)
+        result = {name: round(seconds * 1000, 1) for name, seconds in self.marks.items()}
+        if steps:
+            result["steps"] = {name: round(seconds * 1000, 1) for name, seconds in steps.items()}
+        return result
@@ -0,0 +1,67 @@
+import math
+
+ROCKET_SPEED = 480  # пикселей в секунду
+
+
+def intercept(path, dist, enemy_speed, x, y, speed, iterations=4):
+    # Точка встречи с врагом на пути: ищем время полёта T, при котором
+    # |позиция врага через T - (x, y)| = speed * T. Ракета быстрее врагов, итерации быстро сходятся.
+    t = 0.0
+    for _ in range(iterations):
+        tx, ty = path.position(dist + enemy_speed * t)
+        t = math.hypot(tx - x, ty - y) / speed
+    tx, ty = path.position(dist + enemy_speed * t)
+    return tx, ty
+
+
+class Rocket:
+    # Летит по прямой в точку встречи, рассчитанную при выстреле; угол считается один раз
+    def __init__(self, x, y, tx, ty, damage, speed=ROCKET_SPEED):
+        self.x, self.y = x, y
+        self.px, self.py = x, y
+        self.tx, self.ty = tx, ty
+        self.damage = damage
+        self.alive = True
+        dx, dy = tx - x, ty - y
+        d = math.hypot(dx, dy)
+        self.time_left = d / speed
+        self.vx, self.vy = (dx / d * speed, dy / d * speed) if d else (0.0, 0.0)
+        self.angle = math.degrees(math.atan2(dy, dx)) - 90
+
+
+class Projectiles:
+    # Все ракеты в полёте: одно обновление за тик, без тригонометрии и самонаведения.
+    # items - общий список с Simulation.rockets (удаление идёт через него же).
+
+    def __init__(self, path, targets, events, blast_radius):
+        self.path = path
+        self.targets = targets
+        self.events = events
+        self.blast_radius = blast_radius
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def fire(self, x, y, target, damage):
+        tx, ty = intercept(self.path, target.dist, target.speed, x, y, ROCKET_SPEED)
+        rocket = Rocket(x, y, tx, ty, damage)
+        self.items.append(rocket)
+        return rocket
+
+    def update(self, dt):
+        # Возвращает взорвавшиеся ракеты; урон по площади - через очередь событий
+        done = []
+        for r in self.items:
+            r.px, r.py = r.x, r.y
+            r.time_left -= dt
+            if r.time_left <= 0:
+                r.x, r.y = r.tx, r.ty
+                done.append(r)
+            else:
+                r.x += r.vx * dt
+                r.y += r.vy * dt
+        for r in done:
+            for e in list(self.targets.query(r.x, r.y, self.blast_radius)):
+                self.events.hit(e, r.damage, r)
+        return done
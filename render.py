@@ -0,0 +1,87 @@
+import math
+from array import array
+
+import arcade
+from arcade.gl import BufferDescription
+
+
+def _unit_circle(segments):
+    return [(math.cos(2 * math.pi * i / segments), math.sin(2 * math.pi * i / segments))
+            for i in range(segments + 1)]
+
+
+class GeometryBatch:
+    # Пакет треугольников для лучей, вспышек и радиусов башен.
+    # За кадр вершины копятся в одном массиве и рисуются одним вызовом draw(),
+    # буфер на видеокарте создаётся один раз и только дописывается.
+
+    def __init__(self, dot_segments=12, ring_segments=48):
+        self.ctx = arcade.get_window().ctx
+        self.program = self.ctx.line_generic_with_colors_program
+        self.data = array("f")
+        self.buffer = None
+        self.geometry = None
+        self.dot = _unit_circle(dot_segments)
+        self.ring = _unit_circle(ring_segments)
+
+    def clear(self):
+        del self.data[:]
+
+    @staticmethod
+    def _rgba(color):
+        return tuple(color) if len(color) == 4 else (*color, 255)
+
+    def add_line(self, x1, y1, x2, y2, color, width=1):
+        dx, dy = x2 - x1, y2 - y1
+        d = math.hypot(dx, dy)
+        if d == 0: return
+        nx, ny = -dy / d * width / 2, dx / d * width / 2
+        c = self._rgba(color)
+        ax, ay, bx, by = x1 + nx, y1 + ny, x1 - nx, y1 - ny
+        cx, cy, ex, ey = x2 - nx, y2 - ny, x2 + nx, y2 + ny
+        self.data.extend((ax, ay, *c, bx, by, *c, cx, cy, *c,
+                          ax, ay, *c, cx, cy, *c, ex, ey, *c))
+
+    def add_rect_filled(self, x, y, width, height, color):
+        c = self._rgba(color)
+        x0, y0, x1, y1 = x - width / 2, y - height / 2, x + width / 2, y + height / 2
+        self.data.extend((x0, y0, *c, x1, y0, *c, x1, y1, *c,
+                          x0, y0, *c, x1, y1, *c, x0, y1, *c))
+
+    def add_circle_filled(self, x, y, radius, color):
+        c = self._rgba(color)
+        data = self.data
+        pts = self.dot
+        for i in range(len(pts) - 1):
+            (c0, s0), (c1, s1) = pts[i], pts[i + 1]
+            data.extend((x, y, *c,
+                         x + c0 * radius, y + s0 * radius, *c,
+                         x + c1 * radius, y + s1 * radius, *c))
+
+    def add_circle_outline(self, x, y, radius, color, width=1):
+        c = self._rgba(color)
+        data = self.data
+        pts = self.ring
+        r_in, r_out = radius - width / 2, radius + width / 2
+        for i in range(len(pts) - 1):
+            (c0, s0), (c1, s1) = pts[i], pts[i + 1]
+            ax, ay = x + c0 * r_in, y + s0 * r_in
+            bx, by = x + c0 * r_out, y + s0 * r_out
+            cx, cy = x + c1 * r_out, y + s1 * r_out
+            ex, ey = x + c1 * r_in, y + s1 * r_in
+            data.extend((ax, ay, *c, bx, by, *c, cx, cy, *c,
+                         ax, ay, *c, cx, cy, *c, ex, ey, *c))
+
+    def draw(self):
+        if not self.data: return
+        nbytes = len(self.data) * 4
+        if self.buffer is None or self.buffer.size < nbytes:
+            size = max(nbytes, 2 * self.buffer.size if self.buffer else 64 * 1024)
+            size += -size % 24  # размер кратен одной вершине: 2f координаты + 4f цвет
+            self.buffer = self.ctx.buffer(reserve=size, usage="stream")
+            self.geometry = self.ctx.geometry([
+                BufferDescription(self.buffer, "2f 4f", ("in_vert", "in_color")),
+            ])
+        self.buffer.write(self.data)
+        with self.ctx.enabled(self.ctx.BLEND):
+            self.geometry.render(self.program, mode=self.ctx.TRIANGLES, vertices=len(self.data) // 6)
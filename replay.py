@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from paths import DEFAULT_MAP, load_map
+from simulation import TICK, Simulation
+
+REPLAYS_DIR = "replays"
+
+
+# Журнал матча: seed, сложность, карта и команды игрока по тикам.
+# Повтор прогоняет симуляцию с теми же командами без окна и на максимальной скорости.
+
+def make_log(sim, map_file=DEFAULT_MAP):
+    return {
+        "seed": sim.seed,
+        "difficulty": sim.difficulty,
+        "map": map_file,
+        "batched": sim.horde is not None,
+        "params": sim.overrides,
+        "inputs": sim.inputs,
+        "result": {"state": sim.state, "ticks": sim.ticks, "score": sim.score, "lives": sim.lives},
+    }
+
+
+def save_log(sim, map_file=DEFAULT_MAP, filename=None):
+    if filename is None:
+        os.makedirs(REPLAYS_DIR, exist_ok=True)
+        filename = os.path.join(REPLAYS_DIR, datetime.now().strftime("replay_%Y%m%d_%H%M%S.json"))
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(make_log(sim, map_file), f)
+    return filename
+
+
+def load_log(filename):
+    with open(filename, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def replay(log, batched=None, max_ticks=10_000_000):
+    path = load_map(log.get("map") or DEFAULT_MAP)
+    if batched is None:
+        batched = log.get("batched", False)
+    sim = Simulation(log["difficulty"], path, batched=batched, seed=log["seed"], params=log.get("params"))
+    inputs = log["inputs"]
+    i = 0
+    # Команда с тиком N была отдана после N шагов симуляции - применяем её перед шагом N + 1
+    while sim.ticks < max_ticks:
+        while i < len(inputs) and inputs[i][0] <= sim.ticks:
+            sim.command(*inputs[i][1:])
+            i += 1
+        if sim.state != "GAME": break
+        sim.step(TICK)
+        sim.added.clear()
+        sim.removed.clear()
+    return sim
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python replay.py replays/файл.json [--batched]")
+        sys.exit(1)
+    log = load_log(sys.argv[1])
+    start = time.perf_counter()
+    sim = replay(log, batched=True if "--batched" in sys.argv else None)
+    elapsed = time.perf_counter() - start
+    print(f"{sim.state}: тиков {sim.ticks}, счёт {sim.score}, жизни {sim.lives} - {elapsed:.2f} c "
+          f"({sim.ticks / max(elapsed, 1e-9):.0f} тиков/с)")
+    expected = log.get("result")
+    if expected and expected["state"] != "GAME":
+        got = {"state": sim.state, "ticks": sim.ticks, "score": sim.score, "lives": sim.lives}
+        if got != expected:
+            print(f"Расхождение с записью: ожидалось {expected}")
+            sys.exit(2)
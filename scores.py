@@ -0,0 +1,95 @@
+import heapq
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scores.db")
+
+
+class ScoreStore:
+    # Таблица рекордов. Одно соединение с SQLite живёт в фоновом потоке,
+    # запись идёт через очередь и не тормозит отрисовку.
+    # Топ хранится в памяти и обновляется при добавлении нового результата.
+    # База открывается при первом обращении, а не при запуске игры.
+
+    def __init__(self, filename=DB_FILE, modes=("NORMAL", "HARD"), limit=5):
+        self.filename = filename
+        self.modes = modes
+        self.limit = limit
+        self.top = []
+        self.version = 0  # растёт при каждом изменении топа
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue()
+        self.thread = None
+
+    def _start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._worker, name="scores", daemon=True)
+            self.thread.start()
+
+    def _worker(self):
+        try:
+            conn = sqlite3.connect(self.filename)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    score INTEGER,
+                    mode TEXT,
+                    date TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS records_mode_score ON records (mode, score)")
+            conn.commit()
+            self._set_top(self._query_top(conn))
+        except sqlite3.Error as e:
+            print(f"Не удалось открыть базу рекордов {self.filename}: {e}")
+            return
+
+        while True:
+            task = self.tasks.get()
+            if task is None: break
+            try:
+                conn.execute("INSERT INTO records (score, mode, date) VALUES (?, ?, ?)", task)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Не удалось сохранить рекорд: {e}")
+                continue
+            # Новый результат сразу подмешиваем в топ, без повторного запроса к базе
+            with self.lock:
+                top = self.top + [task]
+            top.sort(key=lambda r: r[0], reverse=True)
+            self._set_top(top[:self.limit])
+        conn.close()
+
+    def _query_top(self, conn):
+        # По индексу (mode, score) берём лучших в каждом режиме и сливаем
+        rows = []
+        for mode in self.modes:
+            rows += conn.execute("SELECT score, mode, date FROM records WHERE mode = ? ORDER BY score DESC LIMIT ?",
+                                 (mode, self.limit)).fetchall()
+        return heapq.nlargest(self.limit, rows, key=lambda r: r[0])
+
+    def _set_top(self, rows):
+        with self.lock:
+            self.top = rows
+            self.version += 1
+
+    def add_score(self, score, mode):
+        self._start()
+        date_str = datetime.now().strftime("%d.%m %H:%M")
+        self.tasks.put((score, mode, date_str))
+
+    def get_top_scores(self):
+        self._start()
+        with self.lock:
+            return list(self.top)
+
+    def close(self):
+        # Дожидаемся записи всех результатов из очереди
+        if self.thread is None: return
+        self.tasks.put(None)
+        self.thread.join()
@@ -0,0 +1,412 @@
+import math
+import random
+from time import perf_counter
+
+from events import KILL, LEAK, EventQueue
+from horde import Horde
+from occupancy import OccupancyGrid
+from paths import load_map
+from projectiles import Projectiles
+from spatial import SpatialGrid
+from targeting import NEAREST, POLICIES, TargetIndex
+from waves import WaveSchedule, roll_kind, wave_bonus
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+GRID_SIZE = 40
+
+COST_BASIC = 25
+COST_SNIPER = 60
+BLAST_RADIUS = 60
+
+# Симуляция идёт фиксированными шагами, независимо от частоты кадров
+SIM_RATE = 60
+TICK = 1 / SIM_RATE
+
+
+# Игровые правила без arcade: только координаты и числа.
+# Окно (tower_defence3.Game) лишь рисует эти объекты и передаёт ввод.
+
+class Enemy:
+    kind = "NORMAL"
+
+    def __init__(self, speed=60.0, hp=50):
+        self.x = 0.0
+        self.y = 0.0
+        self.px = 0.0  # позиция на прошлом тике, для интерполяции при отрисовке
+        self.py = 0.0
+        self.speed = speed  # пикселей в секунду
+        self.hp_max = hp
+        self.hp = hp
+        self.path = None
+        self.dist = 0.0  # пройденное по пути расстояние, оно же "прогресс"
+        self.alive = True
+
+    def set_path(self, path):
+        self.path = path
+        self.dist = 0.0
+        self.x, self.y = path.position(0)
+        self.px, self.py = self.x, self.y
+
+    def update(self, dt):
+        self.px, self.py = self.x, self.y
+        if self.dist >= self.path.length: return
+        self.dist = min(self.dist + self.speed * dt, self.path.length)
+        self.x, self.y = self.path.position(self.dist)
+
+    def reached_end(self):
+        return self.dist >= self.path.length
+
+
+class FastEnemy(Enemy):
+    kind = "FAST"
+
+    def __init__(self):
+        super().__init__(speed=150.0, hp=25)
+
+
+class StrongEnemy(Enemy):
+    kind = "STRONG"
+
+    def __init__(self):
+        super().__init__(speed=42.0, hp=150)
+
+
+ENEMY_TYPES = {"NORMAL": Enemy, "FAST": FastEnemy, "STRONG": StrongEnemy}
+
+
+class Tower:
+    kind = ""
+    cost = 0
+    is_firing = False
+
+    def __init__(self, x, y, range_dist, rate, damage):
+        self.x, self.y = x, y
+        self.range = range_dist
+        self.rate = rate
+        self.damage = damage
+        self.timer = 0
+        self.current_target = None
+        self.angle = 0
+        self.alive = True
+        self.policy = NEAREST
+        self.bands = []  # участки пути в радиусе башни, см. Path.ranges_within
+
+    def in_range(self, e):
+        for d0, d1 in self.bands:
+            if d0 <= e.dist <= d1:
+                return True
+        return False
+
+    def attack_logic(self, dt, targets, bullets, events):
+        self.timer += dt
+
+        t = self.current_target
+        if t is None or not t.alive or t.hp <= 0 or not self.in_range(t):
+            self.current_target = targets.select(self)
+
+        if self.current_target:
+            dx = self.current_target.x - self.x
+            dy = self.current_target.y - self.y
+            self.angle = math.degrees(math.atan2(dy, dx)) - 90
+
+            if self.timer >= self.rate:
+                self.shoot(self.current_target, bullets, targets, events)
+                self.timer = 0
+
+    def shoot(self, target, bullets, targets, events):
+        pass
+
+
+class BasicTower(Tower):
+    kind = "BASIC"
+    cost = COST_BASIC
+    range = 150
+
+    def __init__(self, x, y):
+        # Перезарядка 0.5 сек, урон 10
+        super().__init__(x, y, self.range, 0.5, 10)
+        self.is_firing = False
+        self.fire_timer = 0.0
+        self.fire_duration = 0.15  # Луч виден 0.15 секунды
+
+    def attack_logic(self, dt, targets, bullets, events):
+        # Обновляем таймер видимости лазера
+        if self.is_firing:
+            self.fire_timer -= dt
+            if self.fire_timer <= 0:
+                self.is_firing = False
+
+        super().attack_logic(dt, targets, bullets, events)
+
+    def shoot(self, target, bullets, targets, events):
+        events.hit(target, self.damage, self)
+        self.is_firing = True
+        self.fire_timer = self.fire_duration
+
+
+class SniperTower(Tower):
+    kind = "SNIPER"
+    cost = COST_SNIPER
+    range = 300
+
+    def __init__(self, x, y):
+        super().__init__(x, y, self.range, 2.0, 50)
+
+    def shoot(self, target, bullets, targets, events):
+        bullets.fire(self.x, self.y, target, self.damage)
+
+
+TOWER_TYPES = {"BASIC": BasicTower, "SNIPER": SniperTower}
+
+# Параметры баланса по сложности. Simulation(params=...) может переопределить любые из них,
+# а "towers" - поля башен: {"BASIC": {"cost": 30, "damage": 12, "range": 160, "rate": 0.4}}
+# Состав волн - wave_plan и параметры формулы, см. waves.py; endless - волны без конца.
+DIFFICULTIES = {
+    "NORMAL": {
+        "start_money": 120, "lives": 5, "spawn_rate": 1.5, "strong_chance": 0.3,
+        "first_wave": 10, "wave_growth": 3, "wave_bonus": 50, "waves": 5,
+        "kill_reward": 15, "kill_score": 10, "towers": {},
+        "wave_plan": [], "endless": False, "hp_growth": 1.0, "wave_cluster": 1, "swarm_every": 0, "swarm_size": 0,
+    },
+    "HARD": {
+        "start_money": 80, "lives": 1, "spawn_rate": 1.0, "strong_chance": 0.5,
+        "first_wave": 10, "wave_growth": 5, "wave_bonus": 50, "waves": 5,
+        "kill_reward": 15, "kill_score": 20, "towers": {},
+        "wave_plan": [], "endless": False, "hp_growth": 1.0, "wave_cluster": 1, "swarm_every": 0, "swarm_size": 0,
+    },
+}
+
+
+class Simulation:
+    def __init__(self, difficulty="NORMAL", path=None, batched=False, seed=None, params=None):
+        self.difficulty = difficulty
+        self.overrides = params or {}
+        self.params = {**DIFFICULTIES[difficulty], **self.overrides}
+        # Свой генератор на матч: с тем же seed и теми же командами матч повторяется точно
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.inputs = []  # [тик, действие, аргументы...] - журнал команд игрока
+        self.path = path if path is not None else load_map()
+        self.waypoints = self.path.waypoints
+        self.enemies = []
+        # В пакетном режиме (numpy) враги двигаются все сразу, см. horde.py
+        self.horde = Horde(self.path) if batched else None
+        self.towers = []
+        # Клетки, занятые путём и башнями: проверка при строительстве за O(1)
+        self.build = OccupancyGrid(self.path, self.path.width, self.path.height, GRID_SIZE)
+        # Индекс врагов по клеткам для поиска целей и урона по площади
+        self.grid = SpatialGrid(GRID_SIZE)
+        self.targets = TargetIndex(self.enemies, self.grid, self.horde)
+        # Урон, убийства и утечки за тик; награды и удаление - в cleanup_phase
+        self.events = EventQueue(self.grid)
+        # Ракеты летят по заранее рассчитанной прямой; rockets - тот же список, что projectiles.items
+        self.projectiles = Projectiles(self.path, self.targets, self.events, BLAST_RADIUS)
+        self.rockets = self.projectiles.items
+        # Сущности, появившиеся/исчезнувшие с прошлого вызова drain_changes()
+        self.added = []
+        self.removed = []
+
+        self.money = self.params["start_money"]
+        self.lives = self.params["lives"]
+        self.score = 0
+        self.wave_num = 1
+        # Выпуски врагов текущей волны, рассчитанные при её старте
+        self.schedule = WaveSchedule(self.params, self.rng, TICK)
+        self.schedule.start(1)
+        self.state = "GAME"  # GAME / WIN / GAMEOVER
+        self.ticks = 0
+
+        # Фазы тика по порядку; profiler - объект с методом add(имя, секунды) или None
+        self.phases = [
+            ("spawn", self.spawn_phase),
+            ("move", self.move_phase),
+            ("projectiles", self.projectile_phase),
+            ("targeting", self.targeting_phase),
+            ("cleanup", self.cleanup_phase),
+        ]
+        self.profiler = None
+
+    def step(self, dt):
+        if self.state != "GAME": return
+        self.ticks += 1
+
+        if self.profiler is None:
+            for _, phase in self.phases:
+                phase(dt)
+        else:
+            # Замер каждой фазы тика (bench.py, профайлер в игре)
+            for name, phase in self.phases:
+                start = perf_counter()
+                phase(dt)
+                self.profiler.add(name, perf_counter() - start)
+
+    def spawn_phase(self, dt):
+        group = self.schedule.tick()
+        if group:
+            self.spawn_group(group)
+
+        if self.schedule.finished and len(self.enemies) == 0:
+            self.start_next_wave()
+
+    def move_phase(self, dt):
+        events = self.events
+        if self.horde is not None:
+            self.horde.advance(dt)
+            self.horde.update_grid(self.grid)
+            for e in self.horde.leaked():
+                events.leak(e)
+        else:
+            # Один проход: движение, сетка и проверка конца пути
+            grid = self.grid
+            for e in self.enemies:
+                e.update(dt)
+                if e.reached_end():
+                    events.leak(e)
+                else:
+                    grid.move(e)
+        self.targets.dirty = True
+
+    def projectile_phase(self, dt):
+        self._discard(self.rockets, self.projectiles.update(dt))
+
+    def targeting_phase(self, dt):
+        fired_from = len(self.rockets)
+        for t in self.towers:
+            t.attack_logic(dt, self.targets, self.projectiles, self.events)
+        self.added.extend(self.rockets[fired_from:])
+
+    def cleanup_phase(self, dt):
+        # Все награды и потери за тик - здесь, по событиям; враги удаляются одним вызовом
+        dead = []
+        for kind, e, _, _ in self.events.drain():
+            if kind == KILL:
+                self.score += self.params["kill_score"]
+                self.money += self.params["kill_reward"]
+                dead.append(e)
+            elif kind == LEAK:
+                self.lives -= 1
+                if self.lives <= 0:
+                    self.state = "GAMEOVER"
+                dead.append(e)
+        self._remove_enemies(dead)
+
+    def _remove_enemies(self, dead):
+        self._discard(self.enemies, dead)
+        for e in dead:
+            self.grid.remove(e)
+            if self.horde is not None:
+                self.horde.remove(e)
+
+    def _discard(self, items, dead):
+        if not dead: return
+        for obj in dead:
+            obj.alive = False
+        dead_ids = {id(obj) for obj in dead}
+        items[:] = [obj for obj in items if id(obj) not in dead_ids]
+        self.removed.extend(dead)
+
+    def _add(self, items, obj):
+        items.append(obj)
+        self.added.append(obj)
+
+    def spawn_enemy(self, kind=None):
+        # Один враг вне расписания волны (сценарии bench.py, стресс-тесты); тип - как в волне
+        self.spawn_group([kind or roll_kind(self.rng, self.wave_num, self.params)])
+
+    def spawn_group(self, kinds):
+        # Выпуск волны одним пакетом: все враги в начале пути, в пакетном режиме - одной записью в массивы
+        scale = self.schedule.hp_scale
+        group = []
+        for kind in kinds:
+            enemy = ENEMY_TYPES[kind]()
+            if scale != 1:
+                enemy.hp = enemy.hp_max = enemy.hp_max * scale
+            enemy.set_path(self.path)
+            group.append(enemy)
+        if self.horde is not None:
+            group = self.horde.add_group(group)
+        self.enemies.extend(group)
+        self.added.extend(group)
+        for enemy in group:
+            self.grid.insert(enemy)
+
+    def start_next_wave(self):
+        self.wave_num += 1
+        if self.wave_num > self.params["waves"] and not self.params["endless"]:
+            self.state = "WIN"
+        else:
+            self.schedule.start(self.wave_num)
+            self.money += wave_bonus(self.params, self.wave_num)
+
+    def tower_cost(self, kind):
+        return self.params["towers"].get(kind, {}).get("cost", TOWER_TYPES[kind].cost)
+
+    def tower_range(self, kind):
+        return self.params["towers"].get(kind, {}).get("range", TOWER_TYPES[kind].range)
+
+    def can_place(self, kind, x, y):
+        return self.money >= self.tower_cost(kind) and self.build.is_free(x, y)
+
+    def place_tower(self, kind, x, y):
+        # Координаты клика привязываются к центру клетки сетки
+        if not self.can_place(kind, x, y): return None
+        gx, gy = self.build.snap(x, y)
+        tower = TOWER_TYPES[kind](gx, gy)
+        for name, value in self.params["towers"].get(kind, {}).items():
+            setattr(tower, name, value)
+        tower.bands = self.path.ranges_within(gx, gy, tower.range)
+        self._add(self.towers, tower)
+        self.build.occupy(tower)
+        self.money -= tower.cost
+        return tower
+
+    def command(self, action, *args):
+        # Все действия игрока проходят здесь, поэтому их можно записать и повторить (см. replay.py)
+        self.inputs.append([self.ticks, action, *args])
+        if action == "place":
+            return self.place_tower(*args)
+        if action == "policy":
+            tower = self.tower_at(*args)
+            return self.cycle_policy(tower) if tower else None
+        # select / pause / resume на симуляцию не влияют, только попадают в журнал
+        return None
+
+    def tower_at(self, x, y):
+        return self.build.tower_at(x, y)
+
+    def cycle_policy(self, tower):
+        tower.policy = POLICIES[(POLICIES.index(tower.policy) + 1) % len(POLICIES)]
+        tower.current_target = None
+        return tower.policy
+
+    def drain_changes(self):
+        added, removed = self.added, self.removed
+        self.added, self.removed = [], []
+        return added, removed
+
+    def run(self, dt=TICK, max_ticks=1_000_000):
+        # Прогон матча до конца без окна (для CI и проверки баланса)
+        while self.state == "GAME" and self.ticks < max_ticks:
+            self.step(dt)
+            if self.added or self.removed:
+                self.added.clear()
+                self.removed.clear()
+        return self.state
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    matches = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    start = time.perf_counter()
+    results = {}
+    for i in range(matches):
+        sim = Simulation("NORMAL" if i % 2 == 0 else "HARD")
+        for x in range(100, 800, 80):
+            sim.place_tower("BASIC", x, 200)
+        result = sim.run()
+        results[result] = results.get(result, 0) + 1
+    elapsed = time.perf_counter() - start
+    print(f"{matches} матчей за {elapsed:.2f} c: {results}")
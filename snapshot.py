@@ -0,0 +1,215 @@
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from paths import Path, Waypoint
+from projectiles import Rocket
+from simulation import ENEMY_TYPES, TOWER_TYPES, Simulation
+from targeting import POLICIES
+
+MAGIC = b"TDS2"
+SAVES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saves")
+AUTOSAVE = os.path.join(SAVES_DIR, "autosave.tds")
+
+# Снимок матча: заголовок JSON (параметры, карта, счётчики, состояние генератора)
+# и таблицы сущностей по столбцам - array("d") на каждое поле. Всё вместе сжато zlib.
+# Враги и башни восстанавливаются в том же порядке, поэтому матч после загрузки
+# идёт тик в тик так же, как шёл бы без сохранения.
+
+ENEMY_FIELDS = ("x", "y", "px", "py", "dist", "hp", "hp_max", "speed")
+TOWER_FIELDS = ("x", "y", "timer", "angle", "policy", "target", "firing", "fire_timer")
+ROCKET_FIELDS = ("x", "y", "px", "py", "tx", "ty", "vx", "vy", "time_left", "damage", "angle")
+COUNTERS = ("money", "lives", "score", "wave_num", "state", "ticks")
+
+
+def _columns(rows, fields):
+    return [array("d", (row[i] for row in rows)).tobytes() for i in range(len(fields))]
+
+
+def dumps(sim):
+    enemies = sim.enemies
+    index = {id(e): i for i, e in enumerate(enemies)}
+    kinds = sorted(ENEMY_TYPES)
+    enemy_rows = [(e.x, e.y, e.px, e.py, e.dist, e.hp, e.hp_max, e.speed) for e in enemies]
+    tower_rows = []
+    for t in sim.towers:
+        target = index.get(id(t.current_target), -1) if t.current_target is not None else -1
+        tower_rows.append((t.x, t.y, t.timer, t.angle, POLICIES.index(t.policy), target,
+                           float(t.is_firing), getattr(t, "fire_timer", 0.0)))
+    rocket_rows = [(r.x, r.y, r.px, r.py, r.tx, r.ty, r.vx, r.vy, r.time_left, r.damage, r.angle)
+                   for r in sim.rockets]
+    rng_version, rng_state, gauss = sim.rng.getstate()
+    # Оставшиеся выпуски волны: паузы, размеры и типы подряд, за ними - внеочередные враги
+    schedule = sim.schedule
+    releases = schedule.releases[schedule.next:]
+
+    header = {
+        "difficulty": sim.difficulty,
+        "params": sim.overrides,
+        "seed": sim.seed,
+        "batched": sim.horde is not None,
+        "map": {"name": sim.path.name, "file": sim.path.file, "width": sim.path.width, "height": sim.path.height,
+                "waypoints": [[w.x, w.y] for w in sim.path.waypoints]},
+        "counters": {name: getattr(sim, name) for name in COUNTERS},
+        "rng": [rng_version, gauss],
+        "inputs": sim.inputs,
+        "schedule": {"since": schedule.since, "hp_scale": schedule.hp_scale, "releases": len(releases),
+                     "extra": len(schedule.extra)},
+        "kinds": kinds,
+        "towers": [t.kind for t in sim.towers],
+        "counts": [len(enemy_rows), len(tower_rows), len(rocket_rows)],
+    }
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    parts = [struct.pack("<I", len(head)), head,
+             array("I", rng_state).tobytes(),
+             bytes(kinds.index(e.kind) for e in enemies),
+             array("I", (gap for gap, _ in releases)).tobytes(),
+             array("I", (len(group) for _, group in releases)).tobytes(),
+             bytes(kinds.index(kind) for _, group in releases for kind in group),
+             bytes(kinds.index(kind) for kind in schedule.extra),
+             *_columns(enemy_rows, ENEMY_FIELDS),
+             *_columns(tower_rows, TOWER_FIELDS),
+             *_columns(rocket_rows, ROCKET_FIELDS)]
+    return MAGIC + zlib.compress(b"".join(parts), 1)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def take(self, size):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def table(self, count, fields):
+        cols = []
+        for _ in fields:
+            col = array("d")
+            col.frombytes(self.take(8 * count))
+            cols.append(col)
+        return cols
+
+
+def loads(data, path=None, batched=None):
+    # path - уже загруженная карта, используется, если снимок сделан на ней же; batched - переопределить режим
+    if data[:4] != MAGIC:
+        raise ValueError("Это не файл снимка матча")
+    # Обрезанный или испорченный снимок падает при разборе по-разному - окну отдаём один ValueError
+    try:
+        return _restore(zlib.decompress(data[4:]), path, batched)
+    except (zlib.error, struct.error, IndexError, KeyError, TypeError) as e:
+        raise ValueError(f"Снимок повреждён: {e}") from e
+
+
+def _restore(raw, path, batched):
+    body = _Reader(raw)
+    (head_len,) = struct.unpack("<I", body.take(4))
+    header = json.loads(bytes(body.take(head_len)).decode("utf-8"))
+    rng_state = array("I")
+    rng_state.frombytes(body.take(4 * 625))
+    ne, nt, nr = header["counts"]
+    kinds = header["kinds"]
+    kind_codes = bytes(body.take(ne))
+    nw = header["schedule"]["releases"]
+    gaps, sizes = array("I"), array("I")
+    gaps.frombytes(body.take(4 * nw))
+    sizes.frombytes(body.take(4 * nw))
+    release_kinds = [kinds[c] for c in bytes(body.take(sum(sizes)))]
+    extra = [kinds[c] for c in bytes(body.take(header["schedule"]["extra"]))]
+    ecols = body.table(ne, ENEMY_FIELDS)
+    tcols = body.table(nt, TOWER_FIELDS)
+    rcols = body.table(nr, ROCKET_FIELDS)
+
+    m = header["map"]
+    if path is None or [[w.x, w.y] for w in path.waypoints] != m["waypoints"]:
+        path = Path([Waypoint(x, y) for x, y in m["waypoints"]], m["name"], size=(m["width"], m["height"]),
+                    file=m.get("file"))
+    if batched is None:
+        batched = header["batched"]
+    sim = Simulation(header["difficulty"], path, batched=batched, seed=header["seed"], params=header["params"])
+    for name, value in header["counters"].items():
+        setattr(sim, name, value)
+    version, gauss = header["rng"]
+    sim.rng.setstate((version, tuple(rng_state), gauss))
+    sim.inputs = header["inputs"]
+    schedule = sim.schedule
+    schedule.since, schedule.hp_scale = header["schedule"]["since"], header["schedule"]["hp_scale"]
+    schedule.releases, schedule.next, schedule.extra, pos = [], 0, extra, 0
+    for gap, size in zip(gaps, sizes):
+        schedule.releases.append((gap, release_kinds[pos:pos + size]))
+        pos += size
+    x, y, px, py, dist, hp, hp_max, speed = ecols
+    for i in range(ne):
+        e = ENEMY_TYPES[kinds[kind_codes[i]]]()
+        e.path = path
+        e.x, e.y, e.dist, e.hp, e.hp_max, e.speed = x[i], y[i], dist[i], hp[i], hp_max[i], speed[i]
+        if sim.horde is not None:
+            e = sim.horde.add(e)
+            sim.horde.px[e.slot], sim.horde.py[e.slot] = px[i], py[i]
+        else:
+            e.px, e.py = px[i], py[i]
+        sim.enemies.append(e)
+        sim.grid.insert(e)
+
+    x, y, timer, angle, policy, target, firing, fire_timer = tcols
+    for i, kind in enumerate(header["towers"]):
+        tower = TOWER_TYPES[kind](x[i], y[i])
+        for name, value in sim.params["towers"].get(kind, {}).items():
+            setattr(tower, name, value)
+        tower.bands = path.ranges_within(tower.x, tower.y, tower.range)
+        tower.timer, tower.angle = timer[i], angle[i]
+        tower.policy = POLICIES[int(policy[i])]
+        tower.current_target = sim.enemies[int(target[i])] if target[i] >= 0 else None
+        if hasattr(tower, "fire_timer"):
+            tower.is_firing, tower.fire_timer = bool(firing[i]), fire_timer[i]
+        sim.towers.append(tower)
+        sim.build.occupy(tower)
+
+    for i in range(nr):
+        r = Rocket(rcols[0][i], rcols[1][i], rcols[4][i], rcols[5][i], rcols[9][i])
+        r.px, r.py = rcols[2][i], rcols[3][i]
+        r.vx, r.vy, r.time_left, r.angle = rcols[6][i], rcols[7][i], rcols[8][i], rcols[10][i]
+        sim.rockets.append(r)
+
+    # Окну нужны спрайты для всего восстановленного
+    sim.added = [*sim.towers, *sim.enemies, *sim.rockets]
+    return sim
+
+
+def save(sim, filename=AUTOSAVE):
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    # Сначала во временный файл: оборванная запись не испортит прошлый снимок
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(dumps(sim))
+    os.replace(tmp, filename)
+    return filename
+
+
+def load(filename=AUTOSAVE, path=None, batched=None):
+    with open(filename, "rb") as f:
+        return loads(f.read(), path, batched)
+
+
+if __name__ == "__main__":
+    # python snapshot.py файл.tds - загрузить снимок, показать состояние и время сохранения/загрузки
+    if len(sys.argv) < 2:
+        print("Использование: python snapshot.py saves/файл.tds")
+        sys.exit(1)
+    start = time.perf_counter()
+    sim = load(sys.argv[1])
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    data = dumps(sim)
+    saved = time.perf_counter() - start
+    print(f"{sim.difficulty}, волна {sim.wave_num}, тик {sim.ticks}: врагов {len(sim.enemies)}, "
+          f"башен {len(sim.towers)}, ракет {len(sim.rockets)}, золото {sim.money}, жизни {sim.lives}")
+    print(f"{len(data)} байт, загрузка {loaded * 1000:.1f} мс, сохранение {saved * 1000:.1f} мс")
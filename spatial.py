@@ -0,0 +1,65 @@
+class SpatialGrid:
+    # Равномерная сетка для поиска объектов (с полями x, y) в радиусе.
+    # Каждый объект лежит в ячейке cell_size x cell_size, запрос смотрит только соседние ячейки.
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> {obj: None}, dict сохраняет порядок вставки
+        self.keys = {}  # obj -> (cx, cy)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, obj):
+        key = self.cell_of(obj.x, obj.y)
+        self.keys[obj] = key
+        self.cells.setdefault(key, {})[obj] = None
+
+    def remove(self, obj):
+        key = self.keys.pop(obj, None)
+        if key is None: return
+        cell = self.cells[key]
+        del cell[obj]
+        if not cell:
+            del self.cells[key]
+
+    def move(self, obj):
+        # Вызывается после изменения obj.x / obj.y; ячейка меняется редко
+        key = self.cell_of(obj.x, obj.y)
+        old = self.keys[obj]
+        if key == old: return
+        cell = self.cells[old]
+        del cell[obj]
+        if not cell:
+            del self.cells[old]
+        self.keys[obj] = key
+        self.cells.setdefault(key, {})[obj] = None
+
+    def query(self, x, y, radius):
+        cx0, cy0 = self.cell_of(x - radius, y - radius)
+        cx1, cy1 = self.cell_of(x + radius, y + radius)
+        r2 = radius * radius
+
+        # Если занятых ячеек меньше, чем ячеек в квадрате запроса, дешевле пройти по занятым
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            cells = [cell for (cx, cy), cell in self.cells.items() if cx0 <= cx <= cx1 and cy0 <= cy <= cy1]
+        else:
+            cells = []
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = self.cells.get((cx, cy))
+                    if cell:
+                        cells.append(cell)
+
+        for cell in cells:
+            for obj in cell:
+                dx = obj.x - x
+                dy = obj.y - y
+                if dx * dx + dy * dy <= r2:
+                    yield obj
@@ -0,0 +1,99 @@
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Политики выбора цели башней
+NEAREST, FIRST, LAST, STRONGEST, WEAKEST = "NEAREST", "FIRST", "LAST", "STRONGEST", "WEAKEST"
+POLICIES = [NEAREST, FIRST, LAST, STRONGEST, WEAKEST]
+
+_by_dist = attrgetter("dist")
+
+
+class TargetIndex:
+    # Индексы врагов для башен: сетка (ближайший враг, урон по площади)
+    # и список, отсортированный по прогрессу dist (первый/последний/сильный/слабый).
+    # Радиус башни заранее переведён в участки пути tower.bands, поэтому
+    # враги в радиусе - это непрерывные куски отсортированного списка.
+
+    def __init__(self, enemies, grid, horde=None):
+        self.enemies = enemies
+        self.grid = grid
+        self.horde = horde
+        self.dirty = True
+        self.order = []
+        self.keys = []
+
+    def query(self, x, y, radius):
+        return self.grid.query(x, y, radius)
+
+    def rebuild(self):
+        # Порядок спавна почти совпадает с порядком по прогрессу, сортировка почти линейная.
+        # Убитые и дошедшие за тик враги ещё в списках до cleanup_phase - в индекс они не попадают.
+        if self.horde is not None:
+            h = self.horde
+            dist = h.dist[:h.n]
+            # В массивах неживой - это hp <= 0 (убит) или конец пути (утечка)
+            live = np.flatnonzero((h.hp[:h.n] > 0) & (dist < h.length))
+            idx = live[np.argsort(dist[live], kind="stable")]
+            self.order = idx
+            self.keys = dist[idx]
+        else:
+            self.order = sorted((e for e in self.enemies if e.alive), key=_by_dist)
+            self.keys = [e.dist for e in self.order]
+        self.dirty = False
+
+    def _span(self, d0, d1):
+        if self.horde is not None:
+            return (int(np.searchsorted(self.keys, d0, "left")),
+                    int(np.searchsorted(self.keys, d1, "right")))
+        return bisect_left(self.keys, d0), bisect_right(self.keys, d1)
+
+    def _at(self, k):
+        if self.horde is not None:
+            return self.horde.views[self.order[k]]
+        return self.order[k]
+
+    def select(self, tower):
+        if tower.policy == NEAREST:
+            return self._nearest(tower)
+        if self.dirty:
+            self.rebuild()
+        if tower.policy in (FIRST, LAST):
+            return self._first(tower, last=tower.policy == LAST)
+        return self._by_hp(tower, strongest=tower.policy == STRONGEST)
+
+    def _nearest(self, tower):
+        best, min_d2 = None, tower.range * tower.range
+        for e in self.grid.query(tower.x, tower.y, tower.range):
+            dx, dy = e.x - tower.x, e.y - tower.y
+            d2 = dx * dx + dy * dy
+            if d2 < min_d2 and e.hp > 0:
+                best, min_d2 = e, d2
+        return best
+
+    def _first(self, tower, last):
+        bands = tower.bands if last else reversed(tower.bands)
+        for d0, d1 in bands:
+            lo, hi = self._span(d0, d1)
+            ks = range(lo, hi) if last else range(hi - 1, lo - 1, -1)
+            for k in ks:
+                e = self._at(k)
+                if e.alive and e.hp > 0:
+                    return e
+        return None
+
+    def _by_hp(self, tower, strongest):
+        best, best_hp = None, None
+        for d0, d1 in tower.bands:
+            lo, hi = self._span(d0, d1)
+            for k in range(lo, hi):
+                e = self._at(k)
+                hp = e.hp
+                if hp <= 0 or not e.alive: continue
+                if best is None or (hp > best_hp if strongest else hp < best_hp):
+                    best, best_hp = e, hp
+        return best
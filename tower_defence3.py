@@ -1,482 +1,708 @@
-import math
-import arcade
-import random
-import sqlite3
-from datetime import datetime
-from dataclasses import dataclass
-
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-GRID_SIZE = 40
-
-COST_BASIC = 25
-COST_SNIPER = 60
-BLAST_RADIUS = 60
-
-
-def init_db():
-    conn = sqlite3.connect("scores.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            score INTEGER,
-            mode TEXT,
-            date TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-
-def add_score(score, mode):
-    conn = sqlite3.connect("scores.db")
-    cursor = conn.cursor()
-    date_str = datetime.now().strftime("%d.%m %H:%M")
-    cursor.execute("INSERT INTO records (score, mode, date) VALUES (?, ?, ?)", (score, mode, date_str))
-    conn.commit()
-    conn.close()
-
-
-def get_top_scores(limit=5):
-    conn = sqlite3.connect("scores.db")
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT score, mode, date FROM records ORDER BY score DESC LIMIT ?", (limit,))
-        rows = cursor.fetchall()
-    except sqlite3.OperationalError:
-        return []
-    conn.close()
-    return rows
-
-
-@dataclass
-class Waypoint:
-    x: float
-    y: float
-
-
-class Enemy(arcade.Sprite):
-    def __init__(self, filename, scale, speed=1.0, hp=50):
-        super().__init__(filename, scale)
-        self.speed = speed
-        self.hp_max = hp
-        self.hp = hp
-        self.waypoints = []
-        self.wp = 0
-
-    def set_path(self, p):
-        self.waypoints = p
-        self.wp = 0
-        if len(p) > 0:
-            self.center_x, self.center_y = p[0].x, p[0].y
-
-    def update(self, delta_time: float = 1 / 60):
-        if self.wp >= len(self.waypoints): return
-        t = self.waypoints[self.wp]
-        dx = t.x - self.center_x
-        dy = t.y - self.center_y
-        d = math.hypot(dx, dy)
-        self.angle += 1
-        if d < self.speed:
-            self.center_x, self.center_y = t.x, t.y
-            self.wp += 1
-        else:
-            self.center_x += self.speed * dx / d
-            self.center_y += self.speed * dy / d
-
-    def reached_end(self):
-        return self.wp >= len(self.waypoints)
-
-
-class FastEnemy(Enemy):
-    def __init__(self):
-        super().__init__(":resources:images/space_shooter/meteorGrey_small1.png", 0.8, speed=2.5, hp=25)
-
-
-class StrongEnemy(Enemy):
-    def __init__(self):
-        super().__init__(":resources:images/space_shooter/meteorGrey_big1.png", 0.6, speed=0.7, hp=150)
-
-
-class Rocket(arcade.Sprite):
-    def __init__(self, x, y, target, damage, all_enemies):
-        super().__init__(":resources:images/space_shooter/laserRed01.png", 0.8)
-        self.center_x, self.center_y = x, y
-        self.target = target
-        self.damage = damage
-        self.speed_val = 8
-        self.all_enemies = all_enemies
-        dx = target.center_x - x
-        dy = target.center_y - y
-        self.angle = math.degrees(math.atan2(dy, dx)) - 90
-
-    def update(self, delta_time: float = 1 / 60):
-        if not self.target or self.target.hp <= 0:
-            self.remove_from_sprite_lists()
-            return
-        dx = self.target.center_x - self.center_x
-        dy = self.target.center_y - self.center_y
-        d = math.hypot(dx, dy)
-        self.angle = math.degrees(math.atan2(dy, dx)) - 90
-
-        if d < self.speed_val:
-            for e in self.all_enemies:
-                dist = math.hypot(e.center_x - self.center_x, e.center_y - self.center_y)
-                if dist <= BLAST_RADIUS:
-                    e.hp -= self.damage
-            self.remove_from_sprite_lists()
-        else:
-            self.center_x += self.speed_val * dx / d
-            self.center_y += self.speed_val * dy / d
-
-
-class Tower(arcade.Sprite):
-    def __init__(self, filename, scale, x, y, range_dist, rate, damage):
-        super().__init__(filename, scale)
-        self.center_x, self.center_y = x, y
-        self.range = range_dist
-        self.rate = rate
-        self.damage = damage
-        self.timer = 0
-        self.current_target = None
-
-    def attack_logic(self, dt, enemies, bullets):
-        self.timer += dt
-
-        if not self.current_target or self.current_target.hp <= 0 or \
-                math.hypot(self.current_target.center_x - self.center_x,
-                           self.current_target.center_y - self.center_y) > self.range:
-            self.current_target = None
-            min_dist = self.range
-            for e in enemies:
-                d = math.hypot(e.center_x - self.center_x, e.center_y - self.center_y)
-                if d <= self.range and d < min_dist and e.hp > 0:
-                    min_dist = d
-                    self.current_target = e
-
-        if self.current_target:
-            dx = self.current_target.center_x - self.center_x
-            dy = self.current_target.center_y - self.center_y
-            self.angle = math.degrees(math.atan2(dy, dx)) - 90
-
-            if self.timer >= self.rate:
-                self.shoot(self.current_target, bullets, enemies)
-                self.timer = 0
-
-    def shoot(self, target, bullets, all_enemies):
-        pass
-
-    def draw_laser(self):
-        pass
-
-
-class BasicTower(Tower):
-    def __init__(self, x, y):
-        # Перезарядка 0.5 сек, урон 10
-        super().__init__(":resources:images/space_shooter/playerShip1_blue.png", 0.6, x, y, 150, 0.5, 10)
-        self.is_firing = False
-        self.fire_timer = 0.0
-        self.fire_duration = 0.15  # Луч виден 0.15 секунды
-
-    def attack_logic(self, dt, enemies, bullets):
-        # Обновляем таймер видимости лазера
-        if self.is_firing:
-            self.fire_timer -= dt
-            if self.fire_timer <= 0:
-                self.is_firing = False
-
-        super().attack_logic(dt, enemies, bullets)
-
-    def shoot(self, target, bullets, all_enemies):
-        target.hp -= self.damage
-        self.is_firing = True
-        self.fire_timer = self.fire_duration
-
-    def draw_laser(self):
-        # Рисуем только если сейчас фаза "выстрела"
-        if self.is_firing and self.current_target and self.current_target.hp > 0:
-            arcade.draw_line(self.center_x, self.center_y,
-                             self.current_target.center_x, self.current_target.center_y,
-                             arcade.color.CYAN, 3)
-            # Добавим красивый эффект "пятна" на цели
-            arcade.draw_circle_filled(self.current_target.center_x, self.current_target.center_y, 5, arcade.color.CYAN)
-
-
-class SniperTower(Tower):
-    def __init__(self, x, y):
-        super().__init__(":resources:images/space_shooter/playerShip2_orange.png", 0.7, x, y, 300, 2.0, 50)
-
-    def shoot(self, target, bullets, all_enemies):
-        bullets.append(Rocket(self.center_x, self.center_y, target, self.damage, all_enemies))
-
-    def draw_laser(self):
-        pass
-
-
-class Game(arcade.Window):
-    def __init__(self):
-        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, "Космическая Оборона: Laser Pulse")
-        init_db()
-        self.background = arcade.load_texture(":resources:images/backgrounds/stars.png")
-
-        self.state = "MENU"
-        self.difficulty = "NORMAL"
-
-        self.btn_start = (SCREEN_WIDTH // 2, 400, 200, 50)
-        self.btn_records = (SCREEN_WIDTH // 2, 300, 200, 50)
-        self.btn_exit = (SCREEN_WIDTH // 2, 200, 200, 50)
-        self.btn_back = (100, 50, 100, 40)
-        self.btn_normal = (SCREEN_WIDTH // 2, 350, 200, 50)
-        self.btn_hard = (SCREEN_WIDTH // 2, 250, 200, 50)
-        self.btn_pause = (SCREEN_WIDTH - 60, SCREEN_HEIGHT - 30, 100, 40)
-        self.btn_resume = (SCREEN_WIDTH // 2, 350, 200, 50)
-        self.btn_menu_exit = (SCREEN_WIDTH // 2, 250, 200, 50)
-
-        self.top_scores = []
-        self.setup_game()
-
-    def setup_game(self):
-        self.e = arcade.SpriteList()
-        self.t = arcade.SpriteList()
-        self.b = arcade.SpriteList()
-        self.waypoints = [
-            Waypoint(0, 100), Waypoint(200, 100), Waypoint(200, 300),
-            Waypoint(600, 300), Waypoint(600, 500), Waypoint(SCREEN_WIDTH, 500)
-        ]
-        start_money = 120 if self.difficulty == "NORMAL" else 80
-        start_lives = 5 if self.difficulty == "NORMAL" else 1
-        self.spawn_timer = 0
-        self.money = start_money
-        self.lives = start_lives
-        self.score = 0
-        self.wave_num = 1
-        self.enemies_to_spawn = 10
-        self.spawned_count = 0
-        self.selected_type = "BASIC"
-        self.game_over_saved = False
-        self.towers_objects = []
-
-    def draw_btn(self, btn, text, color=arcade.color.GRAY, text_color=arcade.color.WHITE):
-        x, y, w, h = btn
-        arcade.draw_rect_filled(arcade.XYWH(x, y, w, h), color)
-        arcade.draw_text(text, x, y, text_color, 20, anchor_x="center", anchor_y="center", font_name="Arial")
-
-    def on_draw(self):
-        self.clear()
-        arcade.draw_texture_rect(self.background,
-                                 arcade.XYWH(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, SCREEN_WIDTH, SCREEN_HEIGHT))
-
-        if self.state == "MENU":
-            arcade.draw_text("КОСМИЧЕСКАЯ ОБОРОНА", SCREEN_WIDTH // 2, 500, arcade.color.GOLD, 40, anchor_x="center",
-                             font_name="Arial", bold=True)
-            self.draw_btn(self.btn_start, "Играть", arcade.color.DARK_BLUE)
-            self.draw_btn(self.btn_records, "Рекорды")
-            self.draw_btn(self.btn_exit, "Выход", arcade.color.DARK_RED)
-
-        elif self.state == "DIFFICULTY":
-            arcade.draw_text("ВЫБЕРИ СЛОЖНОСТЬ", SCREEN_WIDTH // 2, 500, arcade.color.WHITE, 30, anchor_x="center",
-                             font_name="Arial")
-            self.draw_btn(self.btn_normal, "Нормально", arcade.color.GREEN)
-            self.draw_btn(self.btn_hard, "ХАРДКОР", arcade.color.RED)
-
-        elif self.state == "RECORDS":
-            arcade.draw_text("ТОП 5 РЕКОРДОВ", SCREEN_WIDTH // 2, 520, arcade.color.GOLD, 30, anchor_x="center",
-                             font_name="Arial")
-            self.draw_btn(self.btn_back, "Назад")
-            y = 450
-            for i, row in enumerate(self.top_scores):
-                s, m, d = row
-                mode_str = "Хард" if m == "HARD" else "Норм"
-                arcade.draw_text(f"{i + 1}. {s} ({mode_str}) - {d}", SCREEN_WIDTH // 2, y, arcade.color.WHITE, 20,
-                                 anchor_x="center", font_name="Arial")
-                y -= 40
-
-        elif self.state in ["GAME", "PAUSE", "GAMEOVER", "WIN"]:
-            pts = [(w.x, w.y) for w in self.waypoints]
-            if len(pts) > 1:
-                arcade.draw_line_strip(pts, (200, 200, 200, 60), 40)
-
-            self.t.draw()
-
-            for tower in self.towers_objects:
-                tower.draw_laser()
-
-            self.e.draw()
-            self.b.draw()
-
-            arcade.draw_text(f"Золото: {self.money}", 10, 570, arcade.color.WHITE, 16, font_name="Arial")
-            arcade.draw_text(f"Жизни: {self.lives}", 10, 550,
-                             arcade.color.RED if self.lives == 1 else arcade.color.WHITE, 16, font_name="Arial")
-            arcade.draw_text(f"Волна: {self.wave_num}", 10, 530, arcade.color.WHITE, 16, font_name="Arial")
-            arcade.draw_text(f"Счет: {self.score}", 10, 510, arcade.color.WHITE, 16, font_name="Arial")
-
-            self.draw_btn(self.btn_pause, "Пауза", arcade.color.DARK_GRAY, arcade.color.WHITE)
-
-            t_name = "Ракетница" if self.selected_type == 'SNIPER' else "Лазер"
-            arcade.draw_text(f"Выбрано: {t_name}", 10, 30, arcade.color.YELLOW, 14, font_name="Arial")
-            arcade.draw_text("1: Лазер (25$) | 2: Ракетница (60$)", 300, 30, arcade.color.WHITE, 14, font_name="Arial")
-
-            if self.state == "PAUSE":
-                arcade.draw_rect_filled(arcade.XYWH(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, SCREEN_WIDTH, SCREEN_HEIGHT),
-                                        (0, 0, 0, 150))
-                arcade.draw_text("ПАУЗА", SCREEN_WIDTH / 2, 450, arcade.color.WHITE, 40, anchor_x="center",
-                                 font_name="Arial")
-                self.draw_btn(self.btn_resume, "Продолжить", arcade.color.GREEN)
-                self.draw_btn(self.btn_menu_exit, "Выйти в Меню", arcade.color.RED)
-
-            elif self.state == "GAMEOVER":
-                arcade.draw_rect_filled(arcade.XYWH(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, 400, 200), arcade.color.BLACK)
-                arcade.draw_text("ВЫ ПРОИГРАЛИ", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 20, arcade.color.RED, 30,
-                                 anchor_x="center", font_name="Arial")
-                arcade.draw_text("Нажми для меню", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 40, arcade.color.GRAY, 14,
-                                 anchor_x="center", font_name="Arial")
-
-            elif self.state == "WIN":
-                arcade.draw_rect_filled(arcade.XYWH(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, 400, 200), arcade.color.BLACK)
-                arcade.draw_text("ПОБЕДА!", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 20, arcade.color.GOLD, 30,
-                                 anchor_x="center", font_name="Arial")
-                arcade.draw_text(f"Итоговый счет: {self.score}", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 20,
-                                 arcade.color.WHITE, 20, anchor_x="center", font_name="Arial")
-                arcade.draw_text("Нажми для меню", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 50, arcade.color.GRAY, 14,
-                                 anchor_x="center", font_name="Arial")
-
-    def on_update(self, dt):
-        if self.state != "GAME": return
-
-        self.spawn_timer += dt
-        spawn_rate = 1.0 if self.difficulty == "HARD" else 1.5
-        if self.spawned_count < self.enemies_to_spawn and self.spawn_timer >= spawn_rate:
-            self.spawn_enemy()
-            self.spawned_count += 1
-            self.spawn_timer = 0
-
-        if self.spawned_count == self.enemies_to_spawn and len(self.e) == 0:
-            self.start_next_wave()
-
-        self.e.update()
-        self.b.update()
-
-        for t in self.towers_objects:
-            t.attack_logic(dt, self.e, self.b)
-
-        for e in self.e:
-            if e.reached_end():
-                self.lives -= 1
-                e.remove_from_sprite_lists()
-                if self.lives <= 0:
-                    self.end_game(win=False)
-
-        for e in list(self.e):
-            if e.hp <= 0:
-                self.score += 10 * (2 if self.difficulty == "HARD" else 1)
-                self.money += 15
-                e.remove_from_sprite_lists()
-
-    def end_game(self, win):
-        self.state = "WIN" if win else "GAMEOVER"
-        if not self.game_over_saved:
-            add_score(self.score, self.difficulty)
-            self.game_over_saved = True
-
-    def spawn_enemy(self):
-        r = random.random()
-        enemy = None
-        strong_chance = 0.5 if self.difficulty == "HARD" else 0.3
-        if self.wave_num >= 3 and r < strong_chance:
-            enemy = StrongEnemy()
-        elif self.wave_num >= 2 and r > 0.7:
-            enemy = FastEnemy()
-        else:
-            enemy = Enemy(":resources:images/space_shooter/meteorGrey_med1.png", 0.7)
-        enemy.set_path(self.waypoints)
-        self.e.append(enemy)
-
-    def start_next_wave(self):
-        self.wave_num += 1
-        if self.wave_num > 5:
-            self.end_game(win=True)
-        else:
-            self.spawned_count = 0
-            self.enemies_to_spawn += 3 if self.difficulty == "NORMAL" else 5
-            self.money += 50
-
-    def check_btn(self, x, y, btn):
-        bx, by, bw, bh = btn
-        return (bx - bw / 2 < x < bx + bw / 2) and (by - bh / 2 < y < by + bh / 2)
-
-    def on_mouse_press(self, x, y, button, modifiers):
-        if self.state == "MENU":
-            if self.check_btn(x, y, self.btn_start):
-                self.state = "DIFFICULTY"
-            elif self.check_btn(x, y, self.btn_records):
-                self.top_scores = get_top_scores()
-                self.state = "RECORDS"
-            elif self.check_btn(x, y, self.btn_exit):
-                arcade.close_window()
-
-        elif self.state == "DIFFICULTY":
-            if self.check_btn(x, y, self.btn_normal):
-                self.difficulty = "NORMAL"
-                self.setup_game()
-                self.state = "GAME"
-            elif self.check_btn(x, y, self.btn_hard):
-                self.difficulty = "HARD"
-                self.setup_game()
-                self.state = "GAME"
-
-        elif self.state == "RECORDS":
-            if self.check_btn(x, y, self.btn_back): self.state = "MENU"
-
-        elif self.state == "GAME":
-            if self.check_btn(x, y, self.btn_pause):
-                self.state = "PAUSE"
-                return
-
-            cost = COST_BASIC if self.selected_type == "BASIC" else COST_SNIPER
-            if self.money < cost: return
-            gx = (x // GRID_SIZE) * GRID_SIZE + GRID_SIZE // 2
-            gy = (y // GRID_SIZE) * GRID_SIZE + GRID_SIZE // 2
-
-            for i in range(len(self.waypoints) - 1):
-                p1, p2 = self.waypoints[i], self.waypoints[i + 1]
-                if min(p1.x, p2.x) - 20 <= gx <= max(p1.x, p2.x) + 20 and min(p1.y, p2.y) - 20 <= gy <= max(p1.y,
-                                                                                                            p2.y) + 20: return
-
-            for t in self.t:
-                if t.center_x == gx and t.center_y == gy: return
-
-            new_tower = None
-            if self.selected_type == "BASIC":
-                new_tower = BasicTower(gx, gy)
-            else:
-                new_tower = SniperTower(gx, gy)
-
-            self.t.append(new_tower)
-            self.towers_objects.append(new_tower)
-            self.money -= cost
-
-        elif self.state == "PAUSE":
-            if self.check_btn(x, y, self.btn_resume):
-                self.state = "GAME"
-            elif self.check_btn(x, y, self.btn_menu_exit):
-                self.state = "MENU"
-
-        elif self.state in ["GAMEOVER", "WIN"]:
-            self.state = "MENU"
-
-    def on_key_press(self, key, modifiers):
-        if self.state == "GAME":
-            if key == arcade.key.KEY_1:
-                self.selected_type = "BASIC"
-            elif key == arcade.key.KEY_2:
-                self.selected_type = "SNIPER"
-            elif key == arcade.key.ESCAPE:
-                self.state = "PAUSE"
-        elif self.state == "PAUSE":
-            if key == arcade.key.ESCAPE: self.state = "GAME"
-
-
-if __name__ == "__main__":
-    game = Game()
-    game.run()
+import time
+
+START = time.perf_counter()  # отсчёт времени запуска, импорт arcade - уже заметная его часть
+
+import arcade
+import json
+import math
+import os
+import sys
+
+from assets import Loader, get_texture
+from audio import Audio, NullBackend, PygletBackend
+from events import KILL, LEAK
+from hud import ProfilerOverlay, Screen
+from paths import DEFAULT_MAP, load_map
+from profiler import FrameProfiler, StartupTimer
+from projectiles import Rocket
+from render import GeometryBatch
+from replay import save_log
+from scores import ScoreStore
+import snapshot
+from simulation import GRID_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, TICK, Simulation, Tower
+from waves import STRESS
+from world import MapCamera, StaticLayer
+
+MAX_STEPS_PER_FRAME = 8  # больше шагов за кадр не догоняем, чтобы не зависнуть на медленной машине
+SPIN_SPEED = 60  # вращение метеоритов, градусов в секунду
+PAN_SPEED = 600  # прокрутка карты с клавиатуры, пикселей экрана в секунду
+CULL_MARGIN = 64  # спрайты дальше этого от края экрана не обновляются и не рисуются
+
+PAN_KEYS = {
+    arcade.key.LEFT: (1, 0), arcade.key.A: (1, 0),
+    arcade.key.RIGHT: (-1, 0), arcade.key.D: (-1, 0),
+    arcade.key.UP: (0, -1), arcade.key.W: (0, -1),
+    arcade.key.DOWN: (0, 1), arcade.key.S: (0, 1),
+}
+
+
+# Спрайты только отображают состояние объектов из simulation.py.
+# alpha - доля времени между прошлым и текущим тиком симуляции, позиции интерполируются.
+
+ENEMY_TEXTURES = {
+    "NORMAL": (":resources:images/space_shooter/meteorGrey_med1.png", 0.7),
+    "FAST": (":resources:images/space_shooter/meteorGrey_small1.png", 0.8),
+    "STRONG": (":resources:images/space_shooter/meteorGrey_big1.png", 0.6),
+}
+
+POLICY_NAMES = {
+    "NEAREST": "Ближайший", "FIRST": "Первый", "LAST": "Последний",
+    "STRONGEST": "Сильнейший", "WEAKEST": "Слабейший",
+}
+
+TOWER_TEXTURES = {
+    "BASIC": (":resources:images/space_shooter/playerShip1_blue.png", 0.6),
+    "SNIPER": (":resources:images/space_shooter/playerShip2_orange.png", 0.7),
+}
+
+ROCKET_TEXTURE = (":resources:images/space_shooter/laserRed01.png", 0.8)
+
+BACKGROUND = ":resources:images/backgrounds/stars.png"
+
+# Всё, что грузится за экраном загрузки, - чтобы первая волна не ждала диска и видеокарты
+TEXTURE_FILES = [BACKGROUND, *(f for f, _ in [*ENEMY_TEXTURES.values(), *TOWER_TEXTURES.values(), ROCKET_TEXTURE])]
+
+
+class SpritePool:
+    # Свободные спрайты не удаляются из SpriteList, а прячутся и ждут следующего врага/ракеты:
+    # так нет ни новых объектов, ни дорогого SpriteList.remove во время волны.
+
+    def __init__(self, sprite_cls, sprite_list):
+        self.sprite_cls = sprite_cls
+        self.sprite_list = sprite_list
+        self.free = []
+
+    def prefill(self, count):
+        for _ in range(count):
+            sprite = self.sprite_cls()
+            self.sprite_list.append(sprite)
+            self.free.append(sprite)
+
+    def acquire(self, model):
+        if self.free:
+            sprite = self.free.pop()
+        else:
+            sprite = self.sprite_cls()
+            self.sprite_list.append(sprite)
+        sprite.reset(model)
+        return sprite
+
+    def release(self, sprite):
+        sprite.model = None
+        sprite.visible = False
+        self.free.append(sprite)
+
+
+class EnemySprite(arcade.Sprite):
+    def __init__(self):
+        filename, scale = ENEMY_TEXTURES["NORMAL"]
+        super().__init__(get_texture(filename), scale)
+        self.model = None
+        self.visible = False
+
+    def reset(self, model):
+        filename, scale = ENEMY_TEXTURES[model.kind]
+        self.texture = get_texture(filename)
+        self.scale = scale
+        self.angle = 0
+        self.model = model
+        self.visible = True
+        self.sync()
+
+    def sync(self, alpha=1.0, dt=0.0):
+        m = self.model
+        self.center_x = m.px + (m.x - m.px) * alpha
+        self.center_y = m.py + (m.y - m.py) * alpha
+        self.angle += SPIN_SPEED * dt
+
+
+class RocketSprite(arcade.Sprite):
+    def __init__(self):
+        filename, scale = ROCKET_TEXTURE
+        super().__init__(get_texture(filename), scale)
+        self.model = None
+        self.visible = False
+
+    def reset(self, model):
+        # Ракета летит по прямой - угол задаётся один раз при выстреле
+        self.model = model
+        self.angle = model.angle
+        self.visible = True
+        self.sync()
+
+    def sync(self, alpha=1.0, dt=0.0):
+        m = self.model
+        self.center_x = m.px + (m.x - m.px) * alpha
+        self.center_y = m.py + (m.y - m.py) * alpha
+
+
+class TowerSprite(arcade.Sprite):
+    def __init__(self, model):
+        filename, scale = TOWER_TEXTURES[model.kind]
+        super().__init__(get_texture(filename), scale)
+        self.model = model
+        self.sync()
+
+    def sync(self, alpha=1.0, dt=0.0):
+        self.center_x, self.center_y = self.model.x, self.model.y
+        self.angle = self.model.angle
+
+    def add_laser(self, batch, alpha):
+        # Рисуем только если сейчас фаза "выстрела"; конец луча - там же, где спрайт цели
+        m = self.model
+        t = m.current_target
+        if m.is_firing and t and t.alive and t.hp > 0:
+            tx, ty = t.px + (t.x - t.px) * alpha, t.py + (t.y - t.py) * alpha
+            batch.add_line(m.x, m.y, tx, ty, arcade.color.CYAN, 3)
+            # Добавим красивый эффект "пятна" на цели
+            batch.add_circle_filled(tx, ty, 5, arcade.color.CYAN)
+
+
+class Game(arcade.Window):
+    def __init__(self, batched=False, map_file=DEFAULT_MAP, record=False, startup_exit=False, params=None,
+                 mute=False):
+        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, "Космическая Оборона: Laser Pulse")
+        # Время до первого кадра и до готового меню; startup_exit - напечатать его и выйти (замеры)
+        self.startup = StartupTimer(START)
+        self.startup.mark("window")
+        self.startup_exit = startup_exit
+        self.batched = batched
+        self.params = params  # переопределение параметров матча (см. DIFFICULTIES), например waves.STRESS
+        self.record = record  # сохранять журнал каждого матча в replays/
+        self.map_file = map_file
+        # Все лучи, вспышки и радиусы башен за кадр рисуются одним вызовом
+        self.fx = GeometryBatch()
+        self.show_ranges = False
+        # F3 - профайлер кадра: фазы симуляции и отрисовки в кольцевом буфере, F4 - сохранить в profiles/
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = None
+        # Таблицы длин пути строятся один раз при загрузке карты; матч из снимка может идти на другой
+        self.path = self.launch_path = load_map(map_file)
+        # База рекордов открывается при первом обращении - экран рекордов или конец матча
+        self.scores = ScoreStore()
+        # Карта может быть больше окна: камера - стрелки/WASD, правая кнопка мыши, колесо
+        self.camera = MapCamera(SCREEN_WIDTH, SCREEN_HEIGHT, self.path.width, self.path.height)
+        self.static = None  # фон и путь, запечённые в текстуры (см. setup_game)
+        # Звуки через постоянный набор голосов; одинаковые за кадр сводятся в один (см. audio.py)
+        self.audio = Audio(NullBackend() if mute else PygletBackend())
+        self.keys_down = set()
+
+        # Спрайты врагов и ракет живут всю игру и переиспользуются между волнами и матчами
+        self.e = arcade.SpriteList(capacity=256)
+        self.t = arcade.SpriteList()
+        self.b = arcade.SpriteList(capacity=64)
+        self.enemy_pool = SpritePool(EnemySprite, self.e)
+        self.rocket_pool = SpritePool(RocketSprite, self.b)
+        self.sprites = {}
+
+        # Окно показывается сразу, остальное догружается за экраном загрузки (см. on_update)
+        self.state = "LOADING"
+        self.screens = {}
+        self.loader = Loader(TEXTURE_FILES, [
+            ("Интерфейс", self.build_ui),
+            ("Спрайты", self.prefill_pools),
+            ("Звуки", self.audio.load_all),
+            ("Карта", self.setup_game),
+        ])
+        self.loading_text = arcade.Text("", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 30, arcade.color.WHITE, 18,
+                                        anchor_x="center")
+        self.difficulty = "NORMAL"
+
+        self.btn_continue = (SCREEN_WIDTH // 2, 460, 200, 50)
+        self.btn_start = (SCREEN_WIDTH // 2, 400, 200, 50)
+        self.btn_records = (SCREEN_WIDTH // 2, 300, 200, 50)
+        self.btn_exit = (SCREEN_WIDTH // 2, 200, 200, 50)
+        self.btn_back = (100, 50, 100, 40)
+        self.btn_normal = (SCREEN_WIDTH // 2, 350, 200, 50)
+        self.btn_hard = (SCREEN_WIDTH // 2, 250, 200, 50)
+        self.btn_pause = (SCREEN_WIDTH - 60, SCREEN_HEIGHT - 30, 100, 40)
+        self.btn_resume = (SCREEN_WIDTH // 2, 350, 200, 50)
+        self.btn_menu_exit = (SCREEN_WIDTH // 2, 250, 200, 50)
+
+        self.top_scores = []
+        self.records_version = -1
+        # Матч, прерванный выходом в меню или закрытием окна, сохраняется снимком и продолжается из меню
+        self.has_save = os.path.exists(snapshot.AUTOSAVE)
+
+    def prefill_pools(self):
+        self.enemy_pool.prefill(64)
+        self.rocket_pool.prefill(32)
+
+    def finish_loading(self):
+        # Загрузить всё сразу, без экрана загрузки (замеры, скрипты)
+        self.loader.finish()
+        self.loaded()
+
+    def loaded(self):
+        self.state = "MENU"
+        self.startup.mark("ready")
+        if self.startup_exit:
+            print(json.dumps(self.startup.report(self.loader.times), ensure_ascii=False))
+            self.close()
+
+    def build_ui(self):
+        # Все надписи создаются один раз; в кадре меняется только текст, если изменилось значение
+        cx, cy = SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2
+        # Два варианта меню: с кнопкой "Продолжить", если есть сохранённый матч, и без неё
+        menus = {}
+        for name in ("MENU", "MENU_SAVED"):
+            menu = Screen()
+            menu.text("title", "КОСМИЧЕСКАЯ ОБОРОНА", SCREEN_WIDTH // 2, 520, arcade.color.GOLD, 40,
+                      anchor_x="center", bold=True)
+            if name == "MENU_SAVED":
+                menu.button("continue", self.btn_continue, "Продолжить", arcade.color.DARK_GREEN)
+            menu.button("start", self.btn_start, "Играть", arcade.color.DARK_BLUE)
+            menu.button("records", self.btn_records, "Рекорды")
+            menu.button("exit", self.btn_exit, "Выход", arcade.color.DARK_RED)
+            menus[name] = menu
+
+        difficulty = Screen()
+        difficulty.text("title", "ВЫБЕРИ СЛОЖНОСТЬ", SCREEN_WIDTH // 2, 500, arcade.color.WHITE, 30, anchor_x="center")
+        difficulty.button("normal", self.btn_normal, "Нормально", arcade.color.GREEN)
+        difficulty.button("hard", self.btn_hard, "ХАРДКОР", arcade.color.RED)
+
+        records = Screen()
+        records.text("title", "ТОП 5 РЕКОРДОВ", SCREEN_WIDTH // 2, 520, arcade.color.GOLD, 30, anchor_x="center")
+        records.button("back", self.btn_back, "Назад")
+        for i in range(5):
+            records.text(f"row{i}", "{}", SCREEN_WIDTH // 2, 450 - 40 * i, arcade.color.WHITE, 20, anchor_x="center")
+
+        pause = Screen()
+        pause.rect(cx, cy, SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, 0, 150))
+        pause.text("title", "ПАУЗА", cx, 450, arcade.color.WHITE, 40, anchor_x="center")
+        pause.button("resume", self.btn_resume, "Продолжить", arcade.color.GREEN)
+        pause.button("menu", self.btn_menu_exit, "Выйти в Меню", arcade.color.RED)
+
+        gameover = Screen()
+        gameover.rect(cx, cy, 400, 200, arcade.color.BLACK)
+        gameover.text("title", "ВЫ ПРОИГРАЛИ", cx, cy + 20, arcade.color.RED, 30, anchor_x="center")
+        gameover.text("hint", "Нажми для меню", cx, cy - 40, arcade.color.GRAY, 14, anchor_x="center")
+
+        win = Screen()
+        win.rect(cx, cy, 400, 200, arcade.color.BLACK)
+        win.text("title", "ПОБЕДА!", cx, cy + 20, arcade.color.GOLD, 30, anchor_x="center")
+        win.text("score", "Итоговый счет: {}", cx, cy - 20, arcade.color.WHITE, 20, anchor_x="center")
+        win.text("hint", "Нажми для меню", cx, cy - 50, arcade.color.GRAY, 14, anchor_x="center")
+
+        self.screens = {**menus, "DIFFICULTY": difficulty, "RECORDS": records,
+                        "PAUSE": pause, "GAMEOVER": gameover, "WIN": win}
+
+        hud = Screen()
+        hud.text("money", "Золото: {}", 10, 570)
+        hud.text("lives", "Жизни: {}", 10, 550)
+        hud.text("wave", "Волна: {}", 10, 530)
+        hud.text("score", "Счет: {}", 10, 510)
+        hud.button("pause", self.btn_pause, "Пауза", arcade.color.DARK_GRAY, arcade.color.WHITE)
+        hud.text("selected", "Выбрано: {}", 10, 30, arcade.color.YELLOW, 14)
+        hud.text("keys", "1: Лазер (25$) | 2: Ракетница (60$) | R: радиусы", 250, 30, arcade.color.WHITE, 14)
+        hud.text("hint", "{}", 10, 55, arcade.color.YELLOW, 14)
+        self.hud = hud
+
+    def update_hud(self):
+        hud, sim = self.hud, self.sim
+        hud["money"].update(sim.money)
+        hud["lives"].update(sim.lives)
+        hud["lives"].set_color(arcade.color.RED if sim.lives == 1 else arcade.color.WHITE)
+        hud["wave"].update(sim.wave_num)
+        hud["score"].update(sim.score)
+        hud["selected"].update("Ракетница" if self.selected_type == "SNIPER" else "Лазер")
+        hud["hint"].update(self.hint if self.hint_timer > 0 else "")
+        self.screens["WIN"]["score"].update(sim.score)
+
+    def update_records(self):
+        # Топ читается из кэша ScoreStore; перерисовываем, только если он изменился
+        if self.scores.version == self.records_version: return
+        self.records_version = self.scores.version
+        self.top_scores = self.scores.get_top_scores()
+        for i in range(5):
+            text = ""
+            if i < len(self.top_scores):
+                s, m, d = self.top_scores[i]
+                mode_str = "Хард" if m == "HARD" else "Норм"
+                text = f"{i + 1}. {s} ({mode_str}) - {d}"
+            self.screens["RECORDS"][f"row{i}"].update(text)
+
+    def setup_game(self, sim=None):
+        # sim - готовая симуляция (матч из снимка), иначе новый матч
+        self.sim = sim or Simulation(self.difficulty, self.launch_path, batched=self.batched, params=self.params)
+        if self.sim.path is not self.path:
+            # Снимок сделан на другой карте - или новый матч после такого снимка
+            self.path = self.sim.path
+            self.camera = MapCamera(SCREEN_WIDTH, SCREEN_HEIGHT, self.path.width, self.path.height)
+        # Статический слой перерисовывается только при смене карты
+        if self.static is None or self.static.path is not self.path:
+            self.static = StaticLayer(self.path, get_texture(BACKGROUND))
+        self.sim.events.listeners.append(self.play_events)
+        for m, sprite in self.sprites.items():
+            self.release_sprite(m, sprite)
+        self.sprites = {}
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.selected_type = "BASIC"
+        self.game_over_saved = False
+        self.resumed = False  # матч продолжен из снимка (см. load_match, drop_save)
+        self.hint = ""
+        self.hint_timer = 0.0
+        self.hover = None  # клетка под курсором для подсветки места постройки
+        self.drag_from = None  # точка, с которой продолжается стройка перетаскиванием
+
+    def play_events(self, events):
+        # Вызывается из тика симуляции: только заявки, звуки запустит audio.update() в конце кадра
+        for kind, enemy, _, _ in events:
+            if kind == KILL:
+                self.audio.play("death", self.sound_pan(enemy.x))
+            elif kind == LEAK:
+                self.audio.play("leak", self.sound_pan(enemy.x))
+
+    def sound_pan(self, x):
+        # Слева направо по экрану: -1..1
+        camera = self.camera
+        return max(-1.0, min(1.0, (x - camera.x) * camera.zoom / (camera.width / 2)))
+
+    def sync_sprites(self, alpha=1.0, dt=0.0):
+        # Создаём/удаляем спрайты для объектов, которые появились или исчезли в симуляции
+        added, removed = self.sim.drain_changes()
+        for m in added:
+            if not m.alive: continue
+            if isinstance(m, Tower):
+                sprite = TowerSprite(m)
+                self.t.append(sprite)
+            elif isinstance(m, Rocket):
+                sprite = self.rocket_pool.acquire(m)
+            else:
+                sprite = self.enemy_pool.acquire(m)
+            self.sprites[m] = sprite
+        for m in removed:
+            sprite = self.sprites.pop(m, None)
+            if sprite: self.release_sprite(m, sprite)
+
+        self.alpha = alpha
+        # Вне экрана объекты продолжают жить в симуляции, но их спрайты не трогаем и не рисуем
+        left, bottom, right, top = self.camera.view(CULL_MARGIN)
+        for m, sprite in self.sprites.items():
+            if left <= m.x <= right and bottom <= m.y <= top:
+                sprite.sync(alpha, dt)
+                if not sprite.visible: sprite.visible = True
+            elif sprite.visible:
+                sprite.visible = False
+
+    def release_sprite(self, m, sprite):
+        if isinstance(m, Tower):
+            sprite.remove_from_sprite_lists()
+        elif isinstance(m, Rocket):
+            self.rocket_pool.release(sprite)
+        else:
+            self.enemy_pool.release(sprite)
+
+    def on_draw(self):
+        prof = self.profiler if self.profiler.enabled else None
+        if prof: prof.start()
+        self.clear()
+
+        if self.state == "LOADING":
+            self.draw_loading()
+        elif self.state in ["GAME", "PAUSE", "GAMEOVER", "WIN"]:
+            self.camera.use()
+            view = self.camera.view()
+            left, bottom, right, top = view
+            self.static.draw(view)
+            if prof: prof.mark("draw_bg")
+
+            self.t.draw()
+            if prof: prof.mark("draw_towers")
+
+            self.fx.clear()
+            for tower in self.t:
+                # Луч и радиус башни не длиннее её радиуса - дальше от экрана их не видно
+                m = tower.model
+                if not (left - m.range <= m.x <= right + m.range and bottom - m.range <= m.y <= top + m.range):
+                    continue
+                if self.show_ranges:
+                    self.fx.add_circle_outline(m.x, m.y, m.range, (255, 255, 255, 50), 2)
+                tower.add_laser(self.fx, self.alpha)
+            if self.state == "GAME" and self.hover:
+                self.add_preview(*self.world_point(*self.hover))
+            self.fx.draw()
+            if prof: prof.mark("draw_fx")
+
+            self.e.draw()
+            self.b.draw()
+            if prof: prof.mark("draw_sprites")
+
+            # Интерфейс - в координатах экрана
+            self.default_camera.use()
+            self.update_hud()
+            self.hud.draw()
+
+        else:
+            arcade.draw_texture_rect(get_texture(BACKGROUND),
+                                     arcade.XYWH(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, SCREEN_WIDTH, SCREEN_HEIGHT))
+
+        # Меню, рекорды или окно поверх игры (пауза / итог)
+        name = "MENU_SAVED" if self.state == "MENU" and self.has_save else self.state
+        screen = self.screens.get(name)
+        if screen:
+            screen.draw()
+        if prof:
+            prof.mark("draw_ui")
+            self.profiler_overlay.draw()
+            prof.mark("profiler")
+        self.startup.mark("first_frame")
+
+    def draw_loading(self):
+        loader = self.loader
+        self.loading_text.text = f"Загрузка: {loader.status}"
+        self.loading_text.draw()
+        x, y, w, h = SCREEN_WIDTH / 2 - 150, SCREEN_HEIGHT / 2 - 10, 300, 16
+        arcade.draw_lbwh_rectangle_outline(x, y, w, h, arcade.color.WHITE, 2)
+        arcade.draw_lbwh_rectangle_filled(x + 2, y + 2, (w - 4) * loader.progress, h - 4, arcade.color.DARK_GREEN)
+
+    def add_preview(self, x, y):
+        # Подсветка клетки под курсором: зелёная - можно строить, красная - нельзя; над башней - её радиус
+        sim = self.sim
+        tower = sim.tower_at(x, y)
+        if tower:
+            self.fx.add_circle_outline(tower.x, tower.y, tower.range, (255, 255, 0, 90), 2)
+            return
+        if sim.build.index(x, y) is None: return
+        gx, gy = sim.build.snap(x, y)
+        ok = sim.can_place(self.selected_type, x, y)
+        self.fx.add_rect_filled(gx, gy, GRID_SIZE - 2, GRID_SIZE - 2, (0, 255, 0, 60) if ok else (255, 0, 0, 60))
+        if ok:
+            self.fx.add_circle_outline(gx, gy, sim.tower_range(self.selected_type), (0, 255, 0, 70), 2)
+
+    def on_update(self, dt):
+        prof = self.profiler if self.profiler.enabled else None
+        if prof: prof.begin_frame()
+        if self.state == "LOADING":
+            if self.loader.update(): self.loaded()
+            return
+        if self.state == "RECORDS":
+            self.update_records()
+        if self.state != "GAME": return
+
+        self.hint_timer -= dt
+        self.scroll(dt)
+        # Фазы тика (spawn, move, ...) симуляция отдаёт профайлеру сама
+        self.sim.profiler = prof
+        # Копим реальное время и отдаём его симуляции целыми тиками
+        self.accumulator = min(self.accumulator + dt, TICK * MAX_STEPS_PER_FRAME)
+        # Небольшой допуск: при 60 FPS сумма dt из-за округления чуть меньше TICK
+        while self.accumulator >= TICK - 1e-6 and self.sim.state == "GAME":
+            self.sim.step(TICK)
+            self.accumulator -= TICK
+        if prof: prof.start()
+        self.sync_sprites(max(self.accumulator, 0.0) / TICK, dt)
+        if prof: prof.mark("sync")
+        self.audio.update(dt)
+        if prof: prof.mark("audio")
+
+        if self.sim.state != "GAME":
+            self.end_game(win=self.sim.state == "WIN")
+
+    def scroll(self, dt):
+        dx = dy = 0
+        for key in self.keys_down:
+            kx, ky = PAN_KEYS[key]
+            dx += kx
+            dy += ky
+        if dx or dy:
+            self.camera.pan(dx * PAN_SPEED * dt, dy * PAN_SPEED * dt)
+
+    def world_point(self, x, y):
+        # Точка экрана -> точка карты (целые координаты, как у клика без камеры)
+        wx, wy = self.camera.to_world(x, y)
+        return math.floor(wx), math.floor(wy)
+
+    def save_match(self):
+        snapshot.save(self.sim)
+        self.has_save = True
+
+    def load_match(self):
+        try:
+            sim = snapshot.load(snapshot.AUTOSAVE, self.path, self.batched)
+        except (OSError, ValueError) as e:
+            print(f"Не удалось загрузить сохранённый матч: {e}")
+            self.has_save = False
+            return
+        self.difficulty = sim.difficulty
+        self.setup_game(sim)
+        self.resumed = True
+        self.sync_sprites()
+        self.state = "GAME"
+
+    def drop_save(self):
+        # Снимок удаляется, только когда закончился матч, продолженный из него
+        if self.has_save and self.resumed:
+            try:
+                os.remove(snapshot.AUTOSAVE)
+            except OSError:
+                pass
+            self.has_save = False
+
+    def end_game(self, win):
+        self.state = "WIN" if win else "GAMEOVER"
+        self.drop_save()
+        if not self.game_over_saved:
+            self.scores.add_score(self.sim.score, self.difficulty)
+            self.game_over_saved = True
+            if self.record:
+                save_log(self.sim, self.sim.path.file or self.map_file)
+
+    def check_btn(self, x, y, btn):
+        bx, by, bw, bh = btn
+        return (bx - bw / 2 < x < bx + bw / 2) and (by - bh / 2 < y < by + bh / 2)
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        if self.state == "MENU":
+            if self.has_save and self.check_btn(x, y, self.btn_continue):
+                self.load_match()
+            elif self.check_btn(x, y, self.btn_start):
+                self.state = "DIFFICULTY"
+            elif self.check_btn(x, y, self.btn_records):
+                self.update_records()
+                self.state = "RECORDS"
+            elif self.check_btn(x, y, self.btn_exit):
+                arcade.close_window()
+
+        elif self.state == "DIFFICULTY":
+            if self.check_btn(x, y, self.btn_normal):
+                self.difficulty = "NORMAL"
+                self.setup_game()
+                self.state = "GAME"
+            elif self.check_btn(x, y, self.btn_hard):
+                self.difficulty = "HARD"
+                self.setup_game()
+                self.state = "GAME"
+
+        elif self.state == "RECORDS":
+            if self.check_btn(x, y, self.btn_back): self.state = "MENU"
+
+        elif self.state == "GAME":
+            if self.check_btn(x, y, self.btn_pause):
+                self.pause()
+                return
+            # Правой или средней кнопкой карта перетаскивается
+            if button != arcade.MOUSE_BUTTON_LEFT: return
+
+            # Клик по своей башне переключает, в кого она целится
+            x, y = self.world_point(x, y)
+            if self.sim.tower_at(x, y):
+                policy = self.sim.command("policy", x, y)
+                self.hint = f"Цель башни: {POLICY_NAMES[policy]}"
+                self.hint_timer = 2.0
+                return
+
+            if self.sim.command("place", self.selected_type, x, y):
+                self.audio.play("build", self.sound_pan(x))
+                self.sync_sprites()
+            self.drag_from = (x, y)
+
+        elif self.state == "PAUSE":
+            if self.check_btn(x, y, self.btn_resume):
+                self.resume()
+            elif self.check_btn(x, y, self.btn_menu_exit):
+                if self.record:
+                    save_log(self.sim, self.sim.path.file or self.map_file)
+                self.save_match()
+                self.state = "MENU"
+
+        elif self.state in ["GAMEOVER", "WIN"]:
+            self.state = "MENU"
+
+    def on_mouse_motion(self, x, y, dx, dy):
+        self.hover = (x, y) if self.state == "GAME" else None
+
+    def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
+        if self.state == "GAME":
+            self.camera.zoom_at(x, y, 1.1 ** scroll_y)
+
+    def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
+        self.hover = (x, y) if self.state == "GAME" else None
+        if self.state != "GAME": return
+        if buttons & (arcade.MOUSE_BUTTON_RIGHT | arcade.MOUSE_BUTTON_MIDDLE):
+            self.camera.pan(dx, dy)
+            return
+        if self.drag_from is None or not buttons & arcade.MOUSE_BUTTON_LEFT: return
+        x, y = self.world_point(x, y)
+        # Ведём мышью с зажатой кнопкой - строим башни во всех клетках по пути курсора.
+        # Между событиями курсор может проскочить клетку, поэтому проходим отрезок с шагом в четверть клетки.
+        x0, y0 = self.drag_from
+        self.drag_from = (x, y)
+        steps = max(1, int(max(abs(x - x0), abs(y - y0)) / (GRID_SIZE / 4)))
+        placed = False
+        for i in range(1, steps + 1):
+            px, py = round(x0 + (x - x0) * i / steps), round(y0 + (y - y0) * i / steps)
+            if self.sim.can_place(self.selected_type, px, py):
+                placed = self.sim.command("place", self.selected_type, px, py) or placed
+        if placed:
+            self.audio.play("build", self.sound_pan(x))
+            self.sync_sprites()
+
+    def on_mouse_release(self, x, y, button, modifiers):
+        self.drag_from = None
+
+    def on_close(self):
+        if self.state in ("GAME", "PAUSE"):
+            self.save_match()
+        self.scores.close()
+        super().on_close()
+
+    def pause(self):
+        self.sim.command("pause")
+        self.state = "PAUSE"
+
+    def resume(self):
+        self.sim.command("resume")
+        self.state = "GAME"
+
+    def select_type(self, kind):
+        self.sim.command("select", kind)
+        self.selected_type = kind
+
+    def toggle_profiler(self):
+        if self.profiler_overlay is None:
+            self.profiler_overlay = ProfilerOverlay(self.profiler)
+        self.profiler.toggle()
+
+    def on_key_release(self, key, modifiers):
+        self.keys_down.discard(key)
+
+    def on_key_press(self, key, modifiers):
+        if key in PAN_KEYS:
+            self.keys_down.add(key)
+        if key == arcade.key.F3:
+            self.toggle_profiler()
+        elif key == arcade.key.F4 and self.profiler.count:
+            filename = self.profiler.save()
+            self.hint = f"Профиль сохранён: {filename}.csv/.json"
+            self.hint_timer = 3.0
+
+        if self.state == "GAME":
+            if key == arcade.key.KEY_1:
+                self.select_type("BASIC")
+            elif key == arcade.key.KEY_2:
+                self.select_type("SNIPER")
+            elif key == arcade.key.R:
+                self.show_ranges = not self.show_ranges
+            elif key == arcade.key.ESCAPE:
+                self.pause()
+        elif self.state == "PAUSE":
+            if key == arcade.key.ESCAPE: self.resume()
+
+
+if __name__ == "__main__":
+    # --batched: пакетный режим врагов на numpy (для очень больших волн)
+    # --map file.json: карта из папки maps или любой другой файл того же формата
+    # --record: сохранять журнал матча для python replay.py
+    # --profile: включить профайлер кадра сразу (F3 - показать/скрыть)
+    # --stress: бесконечные волны по тысяче врагов и больше (waves.STRESS) - нагрузочная проверка
+    # --mute: без звука
+    # --startup: напечатать время запуска по этапам (мс, JSON) и выйти; python bench.py --startup N
+    map_file = sys.argv[sys.argv.index("--map") + 1] if "--map" in sys.argv else DEFAULT_MAP
+    game = Game(batched="--batched" in sys.argv, map_file=map_file, record="--record" in sys.argv,
+                startup_exit="--startup" in sys.argv, params=STRESS if "--stress" in sys.argv else None,
+                mute="--mute" in sys.argv)
+    if "--profile" in sys.argv:
+        game.toggle_profiler()
+    game.run()
@@ -0,0 +1,150 @@
+from itertools import groupby
+
+# Волны по данным. Каждая волна при старте раскладывается в расписание выпусков:
+# (пауза в тиках от прошлого выпуска, [типы врагов]). Выпуск - пачка врагов, которая
+# появляется одним пакетом за один тик; за тик может выйти и несколько выпусков.
+#
+# Волна - список групп, params["wave_plan"] задаёт первые волны явно:
+#   [{"bonus": 50, "groups": [{"kind": "NORMAL", "count": 10, "start": 1.5, "every": 1.5},
+#                             {"kind": "FAST", "count": 40, "start": 5, "every": 0.5, "cluster": 8}]}]
+# kind - тип врага или "MIX" (случайный, как в обычной игре), start и every - секунды,
+# cluster - сколько врагов в одном выпуске. Волны после плана строятся по формуле из params:
+# first_wave + wave_growth * (номер - 1) врагов, каждая swarm_every-я - ещё и рой быстрых.
+
+# Нагрузочный режим: бесконечные волны по тысяче и больше врагов кучками и с роями
+STRESS = {
+    "endless": True, "first_wave": 500, "wave_growth": 500, "spawn_rate": 0.1, "wave_cluster": 10,
+    "swarm_every": 2, "swarm_size": 50, "hp_growth": 1.1, "start_money": 10 ** 9, "lives": 10 ** 9,
+}
+
+
+def ticks_for(seconds, dt):
+    # На каком тике таймер, растущий с нуля на dt за тик, дойдёт до seconds (как прежний spawn_timer)
+    n, t = 0, 0
+    while t < seconds:
+        t += dt
+        n += 1
+    return n
+
+
+def roll_kind(rng, number, params):
+    r = rng.random()
+    if number >= 3 and r < params["strong_chance"]:
+        return "STRONG"
+    if number >= 2 and r > 0.7:
+        return "FAST"
+    return "NORMAL"
+
+
+def wave_groups(params, number):
+    plan = params["wave_plan"]
+    if number <= len(plan):
+        return plan[number - 1]["groups"]
+    rate = params["spawn_rate"]
+    groups = [{"kind": "MIX", "count": params["first_wave"] + params["wave_growth"] * (number - 1),
+               "start": rate, "every": rate, "cluster": params["wave_cluster"]}]
+    size = params["swarm_size"]
+    if params["swarm_every"] and size and number % params["swarm_every"] == 0:
+        # Рой растёт с номером волны: number кучек по size быстрых врагов
+        groups.append({"kind": "FAST", "count": size * number, "start": rate, "every": rate * 4, "cluster": size})
+    return groups
+
+
+def wave_bonus(params, number):
+    plan = params["wave_plan"]
+    if number <= len(plan):
+        return plan[number - 1].get("bonus", params["wave_bonus"])
+    return params["wave_bonus"]
+
+
+def build_wave(params, number, rng, dt):
+    # Расписание волны: [(пауза в тиках, [типы])], выпуски одного тика слиты в один
+    timeline = []
+    for g in wave_groups(params, number):
+        start = ticks_for(g.get("start", 0), dt)
+        every = ticks_for(g.get("every", 0), dt)
+        cluster = max(1, g.get("cluster", 1))
+        for i in range(g["count"]):
+            kind = roll_kind(rng, number, params) if g["kind"] == "MIX" else g["kind"]
+            timeline.append((start + i // cluster * every, kind))
+    timeline.sort(key=lambda item: item[0])
+    releases = []
+    prev = 0
+    for tick, items in groupby(timeline, key=lambda item: item[0]):
+        releases.append((tick - prev, [kind for _, kind in items]))
+        prev = tick
+    return releases
+
+
+class WaveSchedule:
+    # Выпуски текущей волны. since - тиков с прошлого выпуска; счётчик идёт и между волнами,
+    # поэтому первый выпуск новой волны отсчитывается от последнего выпуска прошлой.
+    # extra - враги вне расписания, выходят на ближайшем тике (bench.py держит их число постоянным).
+
+    def __init__(self, params, rng, dt):
+        self.params = params
+        self.rng = rng
+        self.dt = dt
+        self.releases = []
+        self.next = 0
+        self.since = 0
+        self.hp_scale = 1.0
+        self.extra = []
+
+    def start(self, number):
+        self.releases = build_wave(self.params, number, self.rng, self.dt)
+        self.next = 0
+        self.hp_scale = self.params["hp_growth"] ** (number - 1)
+
+    @property
+    def finished(self):
+        return self.next == len(self.releases) and not self.extra
+
+    @property
+    def remaining(self):
+        return sum(len(kinds) for _, kinds in self.releases[self.next:]) + len(self.extra)
+
+    def push(self, kinds):
+        self.extra.extend(kinds)
+
+    def tick(self):
+        # Типы всех врагов, которым пора выйти на этом тике (пустой список - никому)
+        self.since += 1
+        group = self.extra
+        if group: self.extra = []
+        releases = self.releases
+        while self.next < len(releases) and self.since >= releases[self.next][0]:
+            group = group + releases[self.next][1] if group else releases[self.next][1]
+            self.next += 1
+            self.since = 0
+        return group
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from simulation import TICK, Simulation
+
+    # Нагрузка волнами STRESS: python waves.py [волн] [--batched]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 8
+    sim = Simulation(batched="--batched" in sys.argv, seed=1, params=STRESS)
+    build = sim.build
+    for row in range(build.rows):
+        for col in range(build.cols):
+            x, y = col * build.cell_size + build.cell_size // 2, row * build.cell_size + build.cell_size // 2
+            if (row + col) % 2 == 0 and sim.path.ranges_within(x, y, 60):
+                sim.place_tower("SNIPER" if (row + col) % 4 == 0 else "BASIC", x, y)
+    print(f"башен {len(sim.towers)}, пакетный режим: {sim.horde is not None}")
+    while sim.wave_num <= count:
+        wave = sim.wave_num
+        total, times, peak, burst = sim.schedule.remaining, [], 0, 0
+        while sim.wave_num == wave:
+            start = time.perf_counter()
+            sim.step(TICK)
+            times.append(time.perf_counter() - start)
+            # Новые враги тика (у башен и ракет нет hp_max)
+            burst = max(burst, sum(1 for m in sim.added if hasattr(m, "hp_max")))
+            peak = max(peak, len(sim.enemies))
+            sim.drain_changes()
+        print(f"волна {wave:>3}: врагов {total:>6}, на поле до {peak:>6}, за тик до {burst:>4}, "
+              f"тик {sum(times) / len(times) * 1000:.2f} мс (макс {max(times) * 1000:.1f})")
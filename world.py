@@ -0,0 +1,145 @@
+import math
+
+import arcade
+from arcade.camera import Camera2D
+from arcade.gl.geometry import quad_2d
+from arcade.shape_list import ShapeElementList, create_line_strip
+
+CHUNK_SIZE = 1024  # сторона квадрата статического слоя, равна размеру текстуры фона
+PATH_WIDTH = 40
+PATH_COLOR = (200, 200, 200, 60)
+
+# Прямоугольник с текстурой в координатах карты (матрицы камеры arcade - в WindowBlock)
+QUAD_VS = """
+#version 330
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+in vec2 in_vert;
+in vec2 in_uv;
+out vec2 uv;
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_vert, 0.0, 1.0);
+    uv = in_uv;
+}
+"""
+
+QUAD_FS = """
+#version 330
+uniform sampler2D texture0;
+in vec2 uv;
+out vec4 color;
+void main() {
+    // Слой непрозрачный: альфа после смешивания пути с фоном не важна
+    color = vec4(texture(texture0, uv).rgb, 1.0);
+}
+"""
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class MapCamera:
+    # Камера над картой: сдвиг, масштаб и перевод координат мыши в координаты карты.
+    # Карта меньше экрана стоит по центру, больше - камера не уходит за её край.
+
+    def __init__(self, width, height, map_width, map_height, max_zoom=2.0):
+        self.camera = Camera2D()
+        self.width, self.height = width, height
+        self.map_width, self.map_height = map_width, map_height
+        self.max_zoom = max_zoom
+        # Сильнее отдалять нет смысла: карта уже целиком на экране
+        self.min_zoom = min(1.0, width / map_width, height / map_height)
+        self.zoom = 1.0
+        self.x, self.y = width / 2, height / 2
+        self.apply()
+
+    def apply(self):
+        half_w, half_h = self.width / 2 / self.zoom, self.height / 2 / self.zoom
+        if 2 * half_w >= self.map_width:
+            self.x = self.map_width / 2
+        else:
+            self.x = _clamp(self.x, half_w, self.map_width - half_w)
+        if 2 * half_h >= self.map_height:
+            self.y = self.map_height / 2
+        else:
+            self.y = _clamp(self.y, half_h, self.map_height - half_h)
+        self.camera.position = (self.x, self.y)
+        self.camera.zoom = self.zoom
+
+    def pan(self, dx, dy):
+        # dx, dy - сдвиг в пикселях экрана (как у мыши)
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self.apply()
+
+    def zoom_at(self, sx, sy, factor):
+        # Точка карты под курсором остаётся на месте
+        wx, wy = self.to_world(sx, sy)
+        self.zoom = _clamp(self.zoom * factor, self.min_zoom, self.max_zoom)
+        self.x = wx - (sx - self.width / 2) / self.zoom
+        self.y = wy - (sy - self.height / 2) / self.zoom
+        self.apply()
+
+    def to_world(self, sx, sy):
+        return self.x + (sx - self.width / 2) / self.zoom, self.y + (sy - self.height / 2) / self.zoom
+
+    def view(self, margin=0):
+        # Видимая часть карты (left, bottom, right, top), расширенная на margin
+        half_w, half_h = self.width / 2 / self.zoom + margin, self.height / 2 / self.zoom + margin
+        return self.x - half_w, self.y - half_h, self.x + half_w, self.y + half_h
+
+    def use(self):
+        self.camera.use()
+
+
+class StaticLayer:
+    # Неподвижная часть карты - фон и путь - один раз на карту запекается в текстуры
+    # квадратов CHUNK_SIZE. В кадре рисуется по одному прямоугольнику на видимый квадрат,
+    # без повторной отрисовки звёзд и полупрозрачного пути.
+
+    def __init__(self, path, background, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.background = background
+        self.chunk_size = chunk_size
+        self.cols = max(1, math.ceil(path.width / chunk_size))
+        self.rows = max(1, math.ceil(path.height / chunk_size))
+        self.ctx = arcade.get_window().ctx
+        self.program = self.ctx.program(vertex_shader=QUAD_VS, fragment_shader=QUAD_FS)
+        self.chunks = {}  # (col, row) -> (текстура, прямоугольник)
+        self.bake()
+
+    def bake(self):
+        ctx = self.ctx
+        cs = self.chunk_size
+        # Путь рисуется целиком в каждый квадрат: лишнее обрезается краем текстуры,
+        # поэтому на стыках квадратов полупрозрачная линия не накладывается сама на себя
+        shapes = ShapeElementList()
+        shapes.append(create_line_strip([(w.x, w.y) for w in self.path.waypoints], PATH_COLOR, PATH_WIDTH))
+        for row in range(self.rows):
+            for col in range(self.cols):
+                texture = ctx.texture((cs, cs), filter=(ctx.LINEAR, ctx.LINEAR),
+                                      wrap_x=ctx.CLAMP_TO_EDGE, wrap_y=ctx.CLAMP_TO_EDGE)
+                fbo = ctx.framebuffer(color_attachments=[texture])
+                x, y = col * cs + cs / 2, row * cs + cs / 2
+                camera = Camera2D(viewport=arcade.LBWH(0, 0, cs, cs), position=(x, y), render_target=fbo)
+                with camera.activate():
+                    fbo.clear(color=(0, 0, 0, 255))
+                    arcade.draw_texture_rect(self.background, arcade.XYWH(x, y, cs, cs))
+                    shapes.draw()
+                self.chunks[col, row] = texture, quad_2d((cs, cs), (x, y))
+
+    def visible_chunks(self, view):
+        left, bottom, right, top = view
+        cs = self.chunk_size
+        for row in range(max(0, int(bottom // cs)), min(self.rows - 1, int(top // cs)) + 1):
+            for col in range(max(0, int(left // cs)), min(self.cols - 1, int(right // cs)) + 1):
+                yield col, row
+
+    def draw(self, view):
+        for key in self.visible_chunks(view):
+            texture, quad = self.chunks[key]
+            texture.use(0)
+            quad.render(self.program)